@@ -0,0 +1,352 @@
+""" Async versions of the read actions of the projects, issues and comments viewsets, served by the ASGI
+application (see SoftDesk/asgi_urls.py). They return the same JSON as the viewsets, with the database accessed
+through the async ORM so a request waiting on the database doesn't hold a thread. The other methods are
+handed to the viewsets """
+
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F, Prefetch
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound, PermissionDenied
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from API.authentication import cached_user, remember_user
+from API.changes import encode_since
+from API.events import FINAL_EVENTS, event_broker
+from API.exports import EXPORT_FORMATS, aexport_lines, aproject_records
+from API.filters import filter_issues
+from API.hashing import ahash_password
+from API.models import Projects, Users, Contributors, Issues
+from API.pagination import IdCursorPagination, CreatedTimeCursorPagination, IssuesCursorPagination
+from API.serializers import ProjectsListSerializer, ProjectsDetailSerializer, IssuesListSerializer, \
+    IssuesDetailSerializer, CommentsListSerializer, CommentsDetailSerializer, SignupSerializer, \
+    recent_comments_prefetch
+from API.views import ProjectsViewset, ProjectIssuesViewer, IssueCommentsViewer, etag_matches, narrow_queryset, \
+    parse_fields
+
+
+class NotAuthenticated(APIException):
+    status_code = status.HTTP_401_UNAUTHORIZED
+    default_detail = "Informations d'authentification non fournies."
+
+
+def json_response(data, status_code=status.HTTP_200_OK, etag=None):
+    response = HttpResponse(JSONRenderer().render(data), status=status_code, content_type='application/json')
+    if etag:
+        response['ETag'] = etag
+    return response
+
+
+def error_response(exception):
+    detail = exception.detail if isinstance(exception.detail, (dict, list)) else {'detail': exception.detail}
+    return json_response(detail, exception.status_code)
+
+
+async def authenticate(request):
+
+    """ Async version of CachedJWTAuthentication : the token is checked in memory, the user read from the
+    user cache or with aget """
+
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        raise NotAuthenticated()
+    validated_token = authentication.get_validated_token(raw_token)
+    try:
+        user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken("Le jeton ne contient pas d'identifiant d'utilisateur")
+    user = cached_user(user_id)
+    if user is None:
+        try:
+            user = await Users.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+        except Users.DoesNotExist:
+            raise InvalidToken("Utilisateur introuvable")
+        remember_user(user)
+    if not user.is_active:
+        raise InvalidToken("Utilisateur inactif")
+    return user
+
+
+async def get_membership(user, project_id):
+
+    """ Async version of API.permissions.get_project_membership """
+
+    if not str(project_id).isdigit():
+        return None
+    return await Contributors.objects.filter(
+        contributors_project_id=project_id,
+        contributors_user_id=user.pk
+    ).only('id', 'permission', 'role').annotate(
+        project_version=F('contributors_project_id__version')
+    ).afirst()
+
+
+async def member_or_403(request, project_id):
+
+    """ Check the membership, return a 304 response if the client copy is current, None otherwise """
+
+    membership = await get_membership(request.user, project_id)
+    if membership is None:
+        raise PermissionDenied()
+    request.etag = f'W/"{project_id}.{membership.project_version}.json"'
+    if etag_matches(request.etag, request.META.get('HTTP_IF_NONE_MATCH')):
+        return json_response(None, status.HTTP_304_NOT_MODIFIED, etag=request.etag)
+    return None
+
+
+def sparse_fields(request, serializer_class):
+    value = request.GET.get('fields')
+    return parse_fields(value, serializer_class) if value else None
+
+
+def serialize(request, serializer_class, instance, **kwargs):
+    fields = sparse_fields(request, serializer_class)
+    if fields:
+        kwargs['requested_fields'] = fields
+    return serializer_class(instance, **kwargs).data
+
+
+async def paginated(request, queryset, serializer_class, pagination_class, viewset):
+    paginator = pagination_class()
+    drf_request = Request(request)
+    fields = sparse_fields(request, serializer_class)
+    if fields:
+        queryset = narrow_queryset(queryset, fields, viewset.sparse_columns,
+                                   paginator.get_ordering(drf_request, queryset, None))
+    page = await paginator.apaginate_queryset(queryset, drf_request)
+    data = paginator.get_paginated_data(serialize(request, serializer_class, page, many=True))
+    return json_response(data, etag=getattr(request, 'etag', None))
+
+
+async def get_one(queryset, **lookup):
+    try:
+        return await queryset.aget(**lookup)
+    except queryset.model.DoesNotExist:
+        raise NotFound()
+
+
+async def projects_list(request):
+    queryset = Projects.objects.filter(
+        contributors_project_id__contributors_user_id=request.user.pk
+    ).select_related('project_author_user_id')
+    project_id = request.GET.get('projects_id')
+    if project_id:
+        queryset = queryset.filter(pk=project_id) if project_id.isdigit() else queryset.none()
+    return await paginated(request, queryset, ProjectsListSerializer, IdCursorPagination, ProjectsViewset)
+
+
+async def projects_detail(request, pk):
+    not_modified = await member_or_403(request, pk)
+    if not_modified:
+        return not_modified
+    project = await get_one(Projects.objects.select_related('project_author_user_id').prefetch_related(
+        Prefetch('contributors_project_id', queryset=Contributors.objects.select_related('contributors_user_id')),
+        Prefetch('issue_project_id',
+                 queryset=Issues.objects.select_related('issue_author_user_id', 'issue_assignee_user_id'))
+    ), pk=pk)
+    return json_response(serialize(request, ProjectsDetailSerializer, project), etag=request.etag)
+
+
+async def issues_list(request, project_pk):
+    not_modified = await member_or_403(request, project_pk)
+    if not_modified:
+        return not_modified
+    queryset = filter_issues(ProjectIssuesViewer.queryset.filter(issue_project_id=project_pk), request.GET)
+    return await paginated(request, queryset, IssuesListSerializer, IssuesCursorPagination, ProjectIssuesViewer)
+
+
+async def issues_detail(request, project_pk, pk):
+    not_modified = await member_or_403(request, project_pk)
+    if not_modified:
+        return not_modified
+    issue = await get_one(ProjectIssuesViewer.queryset.prefetch_related(recent_comments_prefetch()),
+                          issue_project_id=project_pk, pk=pk)
+    return json_response(serialize(request, IssuesDetailSerializer, issue, context={'request': request}),
+                         etag=request.etag)
+
+
+async def comments_list(request, project_pk, issues_pk):
+    not_modified = await member_or_403(request, project_pk)
+    if not_modified:
+        return not_modified
+    if not await Issues.objects.filter(id=issues_pk, issue_project_id=project_pk).aexists():
+        raise PermissionDenied()
+    queryset = IssueCommentsViewer.queryset.filter(comments_issue_id=issues_pk)
+    return await paginated(request, queryset, CommentsListSerializer, CreatedTimeCursorPagination,
+                           IssueCommentsViewer)
+
+
+async def comments_detail(request, project_pk, issues_pk, pk):
+    not_modified = await member_or_403(request, project_pk)
+    if not_modified:
+        return not_modified
+    comment = await get_one(IssueCommentsViewer.queryset, comments_issue_id=issues_pk,
+                            comments_issue_id__issue_project_id=project_pk, pk=pk)
+    return json_response(serialize(request, CommentsDetailSerializer, comment), etag=request.etag)
+
+
+async def signup(request):
+
+    """ Async version of SignupView : the unique email check and the INSERT run in a thread, the hash in the
+    pool of API.hashing while the event loop serves the other requests """
+
+    if request.method != 'POST':
+        return json_response({'detail': "Méthode non autorisée"}, status.HTTP_405_METHOD_NOT_ALLOWED)
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return json_response({'detail': "JSON invalide"}, status.HTTP_400_BAD_REQUEST)
+    serializer = SignupSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return json_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+    password_hash = await ahash_password(serializer.validated_data['password'])
+    await sync_to_async(serializer.save)(password_hash=password_hash)
+    return json_response(serializer.data, status.HTTP_201_CREATED)
+
+
+# see async_read_view
+signup.csrf_exempt = True
+
+
+def server_sent_event(name, data):
+    return f'event: {name}\ndata: {data}\n\n'
+
+
+async def event_stream(subscription, disconnected=None):
+
+    """ Events of the subscription as Server-Sent Events : a ready event holding the cursor of
+    /api/projects/{id}/changes/ from which the stream is complete, the events of the issues and comments, a
+    comment line every KEEPALIVE seconds without event. It ends after MAX_AGE seconds, after a resync event
+    when the client didn't read fast enough or a project.deleted event, and before the next keepalive once the
+    disconnected event (see API.middleware.DisconnectWatcher) is set. The subscription ends with it, also when
+    the server closes it on a failed write """
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.API_EVENTS['MAX_AGE']
+    try:
+        yield server_sent_event('ready', json.dumps({'since': encode_since(timezone.now())}))
+        while loop.time() < deadline:
+            event = await subscription.get(min(settings.API_EVENTS['KEEPALIVE'], deadline - loop.time()))
+            if disconnected is not None and disconnected.is_set():
+                return
+            if event is None:
+                yield ': keepalive\n\n'
+                continue
+            yield server_sent_event(*event)
+            if event[0] in FINAL_EVENTS:
+                return
+    finally:
+        event_broker.unsubscribe(subscription)
+
+
+class EventStream:
+
+    """ Content of the events response : StreamingHttpResponse calls close() when the response is closed,
+    which ends the subscription """
+
+    def __init__(self, subscription, disconnected=None):
+        self.subscription = subscription
+        self.disconnected = disconnected
+
+    def __aiter__(self):
+        return event_stream(self.subscription, self.disconnected)
+
+    def close(self):
+        event_broker.unsubscribe(self.subscription)
+
+
+async def project_events(request, pk):
+
+    """ Stream of the events of the project (see API.events). The membership is checked once, when the stream
+    opens : the stream ends after API_EVENTS['MAX_AGE'] seconds and the reconnection checks it again """
+
+    if request.method != 'GET':
+        return json_response({'detail': "Méthode non autorisée"}, status.HTTP_405_METHOD_NOT_ALLOWED)
+    if event_broker is None:
+        return json_response({'detail': "Les événements ne sont pas activés"}, status.HTTP_404_NOT_FOUND)
+    try:
+        request.user = await authenticate(request)
+        if await get_membership(request.user, pk) is None:
+            raise PermissionDenied()
+    except APIException as exception:
+        return error_response(exception)
+    # subscribed before the cursor of the ready event is taken, so no write falls between them
+    stream = EventStream(event_broker.subscribe(pk), request.scope.get('softdesk.disconnected'))
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# see async_read_view
+project_events.csrf_exempt = True
+
+
+async def project_export(request, pk):
+
+    """ ProjectsViewset.export streamed from an async iterator : the ASGI handler reads a sync streaming
+    content entirely before sending it, the memory would grow with the project """
+
+    if await get_membership(request.user, pk) is None:
+        raise PermissionDenied()
+    export_format = request.GET.get('export_format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return json_response({'detail': f"Format d'export inconnu, choix possibles : {', '.join(EXPORT_FORMATS)}"},
+                             status.HTTP_400_BAD_REQUEST)
+    response = StreamingHttpResponse(
+        aexport_lines(export_format, aproject_records(pk, settings.API_EXPORT_CHUNK_SIZE)),
+        content_type=EXPORT_FORMATS[export_format][2]
+    )
+    response['Content-Disposition'] = f'attachment; filename="project-{pk}.{export_format}"'
+    return response
+
+
+def async_read_view(read, viewset, actions, **initkwargs):
+
+    """ Serve GET with the async read function, the other methods with the viewset actions """
+
+    sync_view = sync_to_async(viewset.as_view(actions, **initkwargs))
+
+    async def view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await sync_view(request, *args, **kwargs)
+        try:
+            request.user = await authenticate(request)
+            return await read(request, *args, **kwargs)
+        except APIException as exception:
+            return error_response(exception)
+
+    # csrf_exempt() of Django 4.2 wraps the view in a sync function, the flag is set directly
+    view.csrf_exempt = True
+    view.initkwargs = initkwargs
+    return view
+
+
+projects_list_view = async_read_view(projects_list, ProjectsViewset, {'get': 'list', 'post': 'create'},
+                                     basename='projects', detail=False)
+projects_detail_view = async_read_view(projects_detail, ProjectsViewset, {
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'
+}, basename='projects', detail=True)
+issues_list_view = async_read_view(issues_list, ProjectIssuesViewer, {'get': 'list', 'post': 'create'},
+                                   basename='issues', detail=False)
+issues_detail_view = async_read_view(issues_detail, ProjectIssuesViewer, {
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'
+}, basename='issues', detail=True)
+comments_list_view = async_read_view(comments_list, IssueCommentsViewer, {'get': 'list', 'post': 'create'},
+                                     basename='comments', detail=False)
+comments_detail_view = async_read_view(comments_detail, IssueCommentsViewer, {
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'
+}, basename='comments', detail=True)
+project_export_view = async_read_view(project_export, ProjectsViewset, {'get': 'export'}, basename='projects',
+                                      detail=True)
@@ -0,0 +1,47 @@
+import copy
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from API.cache import LRUCacheBackend
+
+USER_CACHE = getattr(settings, 'API_USER_CACHE', {})
+
+user_cache = LRUCacheBackend(max_entries=USER_CACHE.get('MAX_ENTRIES', 4096), timeout=USER_CACHE.get('TIMEOUT', 60))
+
+
+def cached_user(user_id):
+
+    """ Return a copy of the cached user, so a request can't change the instance shared with the others """
+
+    user = user_cache.get(str(user_id))
+    return copy.copy(user) if user is not None else None
+
+
+def remember_user(user):
+    user_cache.set(str(user.pk), copy.copy(user))
+
+
+def forget_user(user_id):
+    user_cache.delete(str(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    """ JWTAuthentication resolving the user of the token from a bounded in-process cache, the entries
+    expire after API_USER_CACHE['TIMEOUT'] seconds and are dropped when the user is saved or deleted """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Le jeton ne contient pas d'identifiant d'utilisateur")
+        user = cached_user(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            remember_user(user)
+        elif not user.is_active:
+            raise AuthenticationFailed("Utilisateur inactif", code="user_inactive")
+        return user
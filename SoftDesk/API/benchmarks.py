@@ -0,0 +1,331 @@
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from API.authentication import user_cache
+from API.cache import response_cache
+from API.counters import recount
+from API.models import Users, Projects, Contributors, Issues, Comments
+
+ENDPOINTS = {
+    'projects-list': '/api/projects/',
+    'projects-detail': '/api/projects/{project}/',
+    'projects-export': '/api/projects/{project}/export/',
+    'users-list': '/api/projects/{project}/users/',
+    'issues-list': '/api/projects/{project}/issues/',
+    'issues-detail': '/api/projects/{project}/issues/{issue}/',
+    'comments-list': '/api/projects/{project}/issues/{issue}/comments/',
+    'comments-detail': '/api/projects/{project}/issues/{issue}/comments/{comment}/',
+}
+
+BATCH_SIZE = 1000
+
+
+def seed_dataset(projects=5, contributors=20, issues=200, comments=5):
+
+    """ Fill the database with projects x contributors x issues x comments, all owned by one user.
+    Return the user and the ids used to build the endpoint URLs """
+
+    user = Users.objects.create(email='benchmark@softdesk.fr', first_name='Bench', last_name='Mark')
+    members = Users.objects.bulk_create([
+        Users(email=f'contributeur-{index}@softdesk.fr', first_name='Prénom', last_name=f'Nom {index}')
+        for index in range(contributors)
+    ], batch_size=BATCH_SIZE)
+    seeded_projects = Projects.objects.bulk_create([
+        Projects(title=f'Projet {index}', description='Description ' * 50, project_type='B',
+                 project_author_user_id=user)
+        for index in range(projects)
+    ], batch_size=BATCH_SIZE)
+    Contributors.objects.bulk_create([
+        Contributors(contributors_user_id=member, contributors_project_id=project, permission=permission,
+                     role=role)
+        for project in seeded_projects
+        for member, permission, role in [(user, Contributors.COMPLETE, Contributors.AUTEUR)] + [
+            (member, Contributors.LIMITEE, Contributors.CONTRIBUTEUR) for member in members]
+    ], batch_size=BATCH_SIZE)
+    for project in seeded_projects:
+        project_issues = Issues.objects.bulk_create([
+            Issues(title=f'Problème {index}', description='Description ' * 50, tag='BAT'[index % 3],
+                   priority='FME'[index % 3], status='AET'[index % 3], issue_project_id=project,
+                   issue_author_user_id=user, issue_assignee_user_id=members[index % len(members)] if members
+                   else user)
+            for index in range(issues)
+        ], batch_size=BATCH_SIZE)
+        for start in range(0, len(project_issues), BATCH_SIZE):
+            Comments.objects.bulk_create([
+                Comments(description='Commentaire ' * 20, comments_author_user_id=user, comments_issue_id=issue)
+                for issue in project_issues[start:start + BATCH_SIZE] for _ in range(comments)
+            ], batch_size=BATCH_SIZE)
+    # bulk_create sends no signal, the counters are computed once at the end
+    recount([project.pk for project in seeded_projects])
+    project = seeded_projects[0]
+    issue = Issues.objects.filter(issue_project_id=project).order_by('id').first()
+    comment = Comments.objects.filter(comments_issue_id=issue).order_by('id').first() if issue else None
+    return user, {
+        'project': project.pk,
+        'issue': issue.pk if issue else 0,
+        'comment': comment.pk if comment else 0,
+    }
+
+
+def authenticated_client(user):
+
+    """ API client sending a real JWT, so authentication is part of the measure """
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    return client
+
+
+def measure(client, url):
+
+    """ Time one GET, counting its SQL queries and the bytes of the response """
+
+    with CaptureQueriesContext(connection) as context:
+        start = time.perf_counter()
+        response = client.get(url)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        elapsed = time.perf_counter() - start
+    return {'status': response.status_code, 'time': elapsed, 'queries': len(context.captured_queries),
+            'bytes': size}
+
+
+def benchmark_endpoints(client, ids, repeat=5, warm_cache=False, endpoints=None):
+
+    """ Measure every endpoint repeat times and return the timings (ms), query count and size of each """
+
+    results = {}
+    for name, pattern in ENDPOINTS.items():
+        if endpoints and name not in endpoints:
+            continue
+        url = pattern.format(**ids)
+        runs = []
+        for _ in range(repeat):
+            if response_cache is not None and not warm_cache:
+                response_cache.backend.clear()
+            runs.append(measure(client, url))
+        times = [run['time'] * 1000 for run in runs]
+        results[name] = {
+            'url': url,
+            'status': runs[-1]['status'],
+            'min_ms': round(min(times), 3),
+            'median_ms': round(statistics.median(times), 3),
+            'max_ms': round(max(times), 3),
+            'queries': runs[-1]['queries'],
+            'bytes': runs[-1]['bytes'],
+        }
+    return results
+
+
+def compare_results(previous, current):
+
+    """ Return one line per endpoint comparing the median time and the queries of two runs """
+
+    lines = []
+    for name, result in current.items():
+        before = previous.get(name)
+        if before is None:
+            continue
+        ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+        lines.append(f"{name:<18} {before['median_ms']:>10.2f} ms -> {result['median_ms']:>10.2f} ms "
+                     f"(x{ratio:.2f})  queries {before['queries']} -> {result['queries']}")
+    return lines
+
+
+def benchmark_user_cache(client, urls, repeat=20):
+
+    """ Measure every url with the user cache emptied before each request (cold) and kept (warm).
+    Return the median time (ms) and the queries of both, the difference is the lookup of the user """
+
+    results = {}
+    for url in urls:
+        result = {'url': url}
+        for name, clear in (('cold', True), ('warm', False)):
+            runs = []
+            for _ in range(repeat):
+                if clear:
+                    user_cache.clear()
+                if response_cache is not None:
+                    response_cache.backend.clear()
+                runs.append(measure(client, url))
+            result[name] = {
+                'status': runs[-1]['status'],
+                'median_ms': round(statistics.median(run['time'] * 1000 for run in runs), 3),
+                'queries': runs[-1]['queries'],
+            }
+        result['queries_saved'] = result['cold']['queries'] - result['warm']['queries']
+        results[url] = result
+    return results
+
+
+def access_token(user):
+    return str(AccessToken.for_user(user))
+
+
+def throughput(total, elapsed, statuses):
+    return {
+        'requests': total,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(total / elapsed, 1) if elapsed else None,
+        'errors': sum(1 for code in statuses if code >= 400),
+    }
+
+
+def wsgi_throughput(user, urls, total=200, concurrency=20):
+
+    """ Send total GETs spread over urls through the WSGI handler from concurrency threads """
+
+    headers = {'Authorization': f'Bearer {access_token(user)}'}
+
+    def get(index):
+        return Client().get(urls[index % len(urls)], headers=headers).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        statuses = list(executor.map(get, range(total)))
+    return throughput(total, time.perf_counter() - start, statuses)
+
+
+def asgi_throughput(user, urls, total=200, concurrency=20, urlconf='SoftDesk.asgi_urls'):
+
+    """ Send total GETs spread over urls through the ASGI handler, concurrency requests at a time """
+
+    headers = {'Authorization': f'Bearer {access_token(user)}'}
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        client = AsyncClient()
+
+        async def get(index):
+            async with semaphore:
+                return (await client.get(urls[index % len(urls)], headers=headers)).status_code
+
+        return await asyncio.gather(*[get(index) for index in range(total)])
+
+    with override_settings(ROOT_URLCONF=urlconf):
+        start = time.perf_counter()
+        statuses = asyncio.run(run())
+        elapsed = time.perf_counter() - start
+    return throughput(total, elapsed, statuses)
+
+
+def signup_payload(index, prefix='inscription'):
+    return {'email': f'{prefix}-{index}@softdesk.fr', 'password': 'Mot2passe!Long', 'password2': 'Mot2passe!Long',
+            'first_name': 'Prénom', 'last_name': f'Nom {index}'}
+
+
+def signup_throughput(total=50, concurrency=10, asgi=False, urlconf='SoftDesk.asgi_urls'):
+
+    """ Send total signups, concurrency at a time, through the WSGI handler from threads or through the ASGI
+    handler from the event loop """
+
+    if not asgi:
+        def post(index):
+            return Client().post('/api/signup/', signup_payload(index, 'wsgi'),
+                                 content_type='application/json').status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            statuses = list(executor.map(post, range(total)))
+        return throughput(total, time.perf_counter() - start, statuses)
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        client = AsyncClient()
+
+        async def post(index):
+            async with semaphore:
+                return (await client.post('/api/signup/', signup_payload(index, 'asgi'),
+                                          content_type='application/json')).status_code
+
+        return await asyncio.gather(*[post(index) for index in range(total)])
+
+    with override_settings(ROOT_URLCONF=urlconf):
+        start = time.perf_counter()
+        statuses = asyncio.run(run())
+        elapsed = time.perf_counter() - start
+    return throughput(total, elapsed, statuses)
+
+
+@contextmanager
+def temporary_database(alias, profile):
+
+    """ Add the database alias, configured by profile (a DATABASES entry), on a new migrated SQLite file """
+
+    with tempfile.TemporaryDirectory() as directory:
+        # configure_settings() fills the missing keys of the databases it's given
+        connections.settings[alias] = connections.configure_settings({
+            'default': {**profile, 'NAME': os.path.join(directory, f'{alias}.sqlite3')}
+        })['default']
+        try:
+            call_command('migrate', database=alias, verbosity=0)
+            yield alias
+        finally:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+
+
+def concurrent_writes(database, writers=8, transactions=50):
+
+    """ Run transactions write transactions from each of writers threads on the database alias database, each
+    reading a project then adding an issue to it and increasing its version like the issue creation route.
+    Return the committed transactions per second and the share of transactions which failed on the lock """
+
+    # bulk_create sends no signal, the signals write to the default database
+    user, = Users.objects.using(database).bulk_create([Users(email=f'ecriture-{time.time_ns()}@softdesk.fr')])
+    project, = Projects.objects.using(database).bulk_create([Projects(
+        title='Projet', description='Description', project_type='B', project_author_user_id=user
+    )])
+    project_id = project.pk
+
+    def write(writer):
+        committed = errors = 0
+        try:
+            for index in range(transactions):
+                try:
+                    with transaction.atomic(using=database):
+                        project = Projects.objects.using(database).get(pk=project_id)
+                        Issues.objects.using(database).bulk_create([Issues(
+                            title=f'Problème {writer}-{index}', description='Description', tag='B', priority='F',
+                            status='A', issue_project_id=project, issue_author_user_id=user,
+                            issue_assignee_user_id=user
+                        )])
+                        Projects.objects.using(database).filter(pk=project_id).update(version=F('version') + 1)
+                    committed += 1
+                except OperationalError:
+                    errors += 1
+        finally:
+            connections[database].close()
+        return committed, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as executor:
+        results = list(executor.map(write, range(writers)))
+    elapsed = time.perf_counter() - start
+    committed = sum(result[0] for result in results)
+    errors = sum(result[1] for result in results)
+    return {
+        'writers': writers,
+        'transactions': writers * transactions,
+        'committed': committed,
+        'errors': errors,
+        'error_rate': round(errors / (writers * transactions), 4),
+        'seconds': round(elapsed, 3),
+        'transactions_per_second': round(committed / elapsed, 1) if elapsed else None,
+    }
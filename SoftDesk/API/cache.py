@@ -0,0 +1,179 @@
+import fnmatch
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+
+class LRUCacheBackend:
+
+    """ In-process cache keeping at most max_entries values, the least recently used are evicted first.
+    With a timeout (seconds) the values also expire """
+
+    def __init__(self, max_entries=1024, timeout=None):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                expires, value = self._entries[key]
+            except KeyError:
+                return None
+            if expires is not None and expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = None if self.timeout is None else time.monotonic() + self.timeout
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCacheBackend:
+
+    """ Cache stored in Redis, or in any client exposing the same get / set / delete / scan_iter methods
+    (see LocalRedisClient) """
+
+    def __init__(self, url='redis://localhost:6379/0', client_class=None, client_options=None, timeout=300,
+                 prefix='softdesk'):
+        if client_class is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImproperlyConfigured("Le paquet 'redis' est nécessaire pour utiliser RedisCacheBackend")
+            self.client = redis.Redis.from_url(url)
+        else:
+            client_class = import_string(client_class) if isinstance(client_class, str) else client_class
+            self.client = client_class(**(client_options or {}))
+        self.timeout = timeout
+        self.prefix = prefix
+
+    def _key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def get(self, key):
+        value = self.client.get(self._key(key))
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def set(self, key, value):
+        self.client.set(self._key(key), json.dumps(value, cls=DjangoJSONEncoder), ex=self.timeout)
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def clear(self):
+        # only the keys of the prefix, the database may hold the data of other applications
+        keys = []
+        for key in self.client.scan_iter(match=f'{self.prefix}:*', count=500):
+            keys.append(key)
+            if len(keys) == 500:
+                self.client.delete(*keys)
+                keys = []
+        if keys:
+            self.client.delete(*keys)
+
+
+class LocalRedisClient:
+
+    """ Stand-in for a Redis client in one process, for the development and the tests : the clients share the
+    keys like the workers connected to one Redis. With max_entries the least recently used keys are evicted
+    first, like the allkeys-lru policy of a Redis with a maxmemory """
+
+    lock = threading.Lock()
+    entries = OrderedDict()
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries
+
+    def _live(self, key):
+        # called with the lock held
+        try:
+            expires, value = self.entries[key]
+        except KeyError:
+            return None
+        if expires is not None and expires < time.monotonic():
+            del self.entries[key]
+            return None
+        return value
+
+    def get(self, key):
+        with self.lock:
+            value = self._live(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ex=None):
+        expires = None if ex is None else time.monotonic() + ex
+        with self.lock:
+            self.entries[key] = (expires, value.encode() if isinstance(value, str) else value)
+            self.entries.move_to_end(key)
+            while self.max_entries is not None and len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return True
+
+    def delete(self, *keys):
+        with self.lock:
+            return sum(self.entries.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match='*', count=None):
+        with self.lock:
+            keys = [key for key in list(self.entries)
+                    if self._live(key) is not None and fnmatch.fnmatchcase(key, match)]
+        yield from keys
+
+
+class ResponseCache:
+
+    """ Cache of serialized responses, namespaced by project.
+    The version of the project is part of every key : a write in any worker bumps it in the database,
+    so the responses cached before never match again and are evicted by the backend (LRU or timeout) """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def make_key(self, project_id, project_version, permission, path):
+        return f'project:{project_id}:{project_version}:{permission}:{path}'
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, data):
+        self.backend.set(key, data)
+
+
+def build_response_cache():
+
+    """ Build the response cache from the API_RESPONSE_CACHE setting """
+
+    config = getattr(settings, 'API_RESPONSE_CACHE', {})
+    if not config.get('ENABLED', True):
+        return None
+    backend_class = import_string(config.get('BACKEND', 'API.cache.LRUCacheBackend'))
+    return ResponseCache(backend_class(**config.get('OPTIONS', {})))
+
+
+response_cache = build_response_cache()
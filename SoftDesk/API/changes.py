@@ -0,0 +1,91 @@
+""" Delta sync of a project : the contributors, issues and comments created, updated or deleted after a cursor.
+The cursor is the time the previous sync started, the rows are read by their updated_time from the
+(project, updated_time) indexes and the deletions from the Deletions tombstones, so the cost of a sync
+depends on the number of changes and not on the size of the project """
+
+import base64
+import binascii
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from API.models import Projects, Contributors, Issues, Comments, Deletions
+from API.serializers import ProjectsDetailSerializer, UsersSerializer, IssuesListSerializer, CommentsListSerializer
+
+PROJECT_FIELDS = ('id', 'title', 'project_type', 'project_author_user_id', 'description')
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "Ce curseur est trop ancien, rechargez le projet entier puis synchronisez sans curseur."
+
+
+def encode_since(moment):
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode()
+
+
+def decode_since(cursor):
+
+    """ Time of a cursor returned by project_changes, raise a ValidationError if it's invalid """
+
+    try:
+        moment = parse_datetime(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        moment = None
+    if moment is None or timezone.is_naive(moment):
+        raise ValidationError({'since': ["Curseur invalide, utilisez le curseur de la synchronisation précédente"]})
+    return moment
+
+
+def changed(queryset, field, start):
+    if start is not None:
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    return queryset.order_by(field, 'id')
+
+
+def project_comments(project_id):
+    # read with one range of the (issue, updated_time) index by issue of the project, the changes of the other
+    # projects aren't read
+    issues = Issues.objects.filter(issue_project_id=project_id).values('pk')
+    return Comments.objects.filter(comments_issue_id__in=issues)
+
+
+def project_changes(project_id, since=None):
+
+    """ Return the project if it changed, its contributors, issues and comments created or updated and the ids
+    of those deleted since the cursor since (everything when since is None), with the cursor of the next sync.
+    A row is sent again by the syncs which start less than API_CHANGES['OVERLAP'] seconds after it was written :
+    the client applies the changes as upserts, then removes the deleted ids """
+
+    now = timezone.now()
+    start = None
+    if since is not None:
+        start = decode_since(since)
+        if start < now - timedelta(days=settings.API_CHANGES['TOMBSTONE_RETENTION']):
+            raise CursorExpired()
+        start -= timedelta(seconds=settings.API_CHANGES['OVERLAP'])
+
+    project = changed(Projects.objects.filter(pk=project_id), 'updated_time', start).select_related(
+        'project_author_user_id').first()
+    contributors = changed(Contributors.objects.filter(contributors_project_id=project_id), 'updated_time',
+                           start).select_related('contributors_user_id')
+    issues = changed(Issues.objects.filter(issue_project_id=project_id), 'updated_time', start).select_related(
+        'issue_author_user_id', 'issue_assignee_user_id')
+    comments = changed(project_comments(project_id), 'updated_time', start).select_related('comments_author_user_id')
+    deleted = {model: [] for model, label in Deletions.MODEL_CHOICES}
+    if start is not None:
+        for model, object_id in changed(Deletions.objects.filter(deleted_project_id=project_id), 'deleted_time',
+                                        start).values_list('model', 'object_id'):
+            deleted[model].append(object_id)
+    return {
+        'since': encode_since(now),
+        'project': ProjectsDetailSerializer(project, fields=PROJECT_FIELDS).data if project else None,
+        'contributors': UsersSerializer(contributors, many=True).data,
+        'issues': IssuesListSerializer(issues, many=True).data,
+        'comments': CommentsListSerializer(comments, many=True).data,
+        'deleted': deleted,
+    }
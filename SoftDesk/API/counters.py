@@ -0,0 +1,71 @@
+""" Counters of the projects and issues.
+They are maintained with F() increments by API.signals and the bulk writes, the functions below count the
+rows again to repair them or to detect a drift """
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from API.models import Projects, Contributors, Issues, Comments
+
+
+def count_of(queryset, group_by):
+
+    """ Correlated subquery counting the rows of queryset grouped by group_by, 0 when there is none """
+
+    counts = queryset.order_by().values(group_by).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def project_counts():
+    return {
+        'issue_count': count_of(Issues.objects.filter(issue_project_id=OuterRef('pk')), 'issue_project_id'),
+        'open_issue_count': count_of(
+            Issues.objects.filter(issue_project_id=OuterRef('pk')).exclude(status=Issues.TERMINE),
+            'issue_project_id'
+        ),
+        'comment_count': count_of(Comments.objects.filter(comments_issue_id__issue_project_id=OuterRef('pk')),
+                                  'comments_issue_id__issue_project_id'),
+        'contributor_count': count_of(Contributors.objects.filter(contributors_project_id=OuterRef('pk')),
+                                      'contributors_project_id'),
+    }
+
+
+def issue_counts():
+    return {
+        'comment_count': count_of(Comments.objects.filter(comments_issue_id=OuterRef('pk')), 'comments_issue_id'),
+    }
+
+
+def drifted(model, counts):
+
+    """ Return (id, field, stored value, actual value) for every counter of model which is wrong """
+
+    annotations = {f'actual_{field}': expression for field, expression in counts.items()}
+    mismatch = Q()
+    for field in counts:
+        mismatch |= ~Q(**{field: F(f'actual_{field}')})
+    drift = []
+    for row in model.objects.annotate(**annotations).filter(mismatch).values('pk', *counts, *annotations):
+        drift += [(row['pk'], field, row[field], row[f'actual_{field}'])
+                  for field in counts if row[field] != row[f'actual_{field}']]
+    return drift
+
+
+def find_drift():
+
+    """ Return {'projects': [...], 'issues': [...]} listing the wrong counters """
+
+    return {'projects': drifted(Projects, project_counts()), 'issues': drifted(Issues, issue_counts())}
+
+
+def recount(project_ids=None):
+
+    """ Recompute the counters, of every project or of the projects of project_ids """
+
+    projects = Projects.objects.all()
+    issues = Issues.objects.all()
+    if project_ids is not None:
+        projects = projects.filter(pk__in=project_ids)
+        issues = issues.filter(issue_project_id__in=project_ids)
+    issues.update(**issue_counts())
+    projects.update(**project_counts())
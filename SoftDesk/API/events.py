@@ -0,0 +1,244 @@
+""" Live events of the projects, streamed by the /api/projects/{id}/events/ route of the ASGI application.
+The signals of the issues and comments publish an event to the broker of the process, which hands it to the
+queues of the streams subscribed to the project. With a fan-out the events go through Redis PUBLISH /
+PSUBSCRIBE, so the streams served by every worker receive the writes of all of them.
+The queue of a stream is bounded : a client which doesn't read its events fast enough gets a resync event
+and its stream is closed, it catches up with /api/projects/{id}/changes/. The deletion of the project ends
+its streams with a project.deleted event """
+
+import asyncio
+import fnmatch
+import json
+import logging
+import queue
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+from API.models import Projects, Issues
+from API.serializers import IssuesListSerializer, CommentsListSerializer
+
+logger = logging.getLogger('API.events')
+
+# put in the queue of a stream in place of the events it couldn't keep
+RESYNC = ('resync', '{}')
+# names of the events after which a stream ends
+FINAL_EVENTS = ('resync', 'project.deleted')
+
+
+def model_event(instance, action):
+
+    """ (name, JSON data) of the event of the creation, update or deletion of an issue or a comment, or of
+    the deletion of a project """
+
+    if isinstance(instance, Projects):
+        return f'project.{action}', json.dumps({'id': instance.pk})
+    if isinstance(instance, Issues):
+        name, serializer_class, data = 'issue', IssuesListSerializer, {'id': instance.pk}
+    else:
+        name, serializer_class = 'comment', CommentsListSerializer
+        data = {'id': instance.pk, 'comments_issue_id': instance.comments_issue_id_id}
+    if action != 'deleted':
+        data = serializer_class(instance).data
+    return f'{name}.{action}', json.dumps(data, cls=DjangoJSONEncoder)
+
+
+class Subscription:
+
+    """ Bounded queue of the events of a project, read by one stream on its event loop """
+
+    def __init__(self, project_id, queue_size):
+        self.project_id = project_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+    def put(self, event):
+        # called on the event loop of the stream
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self, timeout):
+
+        """ Next (name, data) event, None if there was none for timeout seconds """
+
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker:
+
+    """ In-process publish / subscribe of the project events, through a fan-out when there is one """
+
+    def __init__(self, queue_size=100, fanout=None):
+        self.queue_size = queue_size
+        self.fanout = fanout
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, project_id):
+        if self.fanout is not None:
+            self.fanout.start(self.dispatch)
+        subscription = Subscription(int(project_id), self.queue_size)
+        with self._lock:
+            self._subscriptions[subscription.project_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.project_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.project_id, None)
+
+    def wanted(self, project_id):
+        # without a fan-out, no event is built for a project nobody streams in this process
+        return self.fanout is not None or int(project_id) in self._subscriptions
+
+    def publish(self, project_id, event):
+        if self.fanout is not None:
+            self.fanout.publish(project_id, event)
+        else:
+            self.dispatch(project_id, event)
+
+    def dispatch(self, project_id, event):
+
+        """ Hand the event to the streams of the project, from any thread """
+
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(int(project_id), ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # the loop of the stream is closed
+                self.unsubscribe(subscription)
+
+
+class RedisFanout:
+
+    """ Fan-out of the events to the brokers of every worker with Redis PUBLISH / PSUBSCRIBE, or with any
+    client exposing the same publish and pubsub methods (see LocalPubSubClient) """
+
+    def __init__(self, url='redis://localhost:6379/0', client_class=None, prefix='softdesk:events'):
+        if client_class is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImproperlyConfigured("Le paquet 'redis' est nécessaire pour utiliser RedisFanout")
+            self.client = redis.Redis.from_url(url)
+        else:
+            client_class = import_string(client_class) if isinstance(client_class, str) else client_class
+            self.client = client_class()
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def publish(self, project_id, event):
+        self.client.publish(f'{self.prefix}:{project_id}', json.dumps(event))
+
+    def start(self, dispatch):
+        with self._lock:
+            if self._thread is None:
+                pubsub = self.client.pubsub()
+                pubsub.psubscribe(f'{self.prefix}:*')
+                self._thread = threading.Thread(target=self.run, args=(pubsub, dispatch), name='events-fanout',
+                                                daemon=True)
+                self._thread.start()
+
+    def run(self, pubsub, dispatch):
+        try:
+            for message in pubsub.listen():
+                if message['type'] != 'pmessage':
+                    continue
+                try:
+                    channel, data = message['channel'], message['data']
+                    channel = channel.decode() if isinstance(channel, bytes) else channel
+                    dispatch(channel.rsplit(':', 1)[1], tuple(json.loads(data)))
+                except (ValueError, TypeError):
+                    logger.exception("Événement illisible reçu de la diffusion")
+        except Exception:
+            logger.exception("Diffusion des événements interrompue")
+            with self._lock:
+                # the next subscription starts a new listener
+                self._thread = None
+
+
+class LocalPubSub:
+
+    """ Subscription of LocalPubSubClient, with the psubscribe / listen methods of a redis-py PubSub """
+
+    def __init__(self, client):
+        self.client = client
+        self.patterns = []
+        self.messages = queue.Queue()
+
+    def psubscribe(self, *patterns):
+        self.patterns.extend(patterns)
+        with self.client.lock:
+            self.client.subscribers.append(self)
+
+    def listen(self):
+        while True:
+            yield self.messages.get()
+
+
+class LocalPubSubClient:
+
+    """ Stand-in for a Redis client in one process, for the development and the tests : the clients share the
+    channels, so the brokers built with it behave like the brokers of workers connected to one Redis """
+
+    lock = threading.Lock()
+    subscribers = []
+
+    def publish(self, channel, data):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for pubsub in subscribers:
+            for pattern in pubsub.patterns:
+                if fnmatch.fnmatchcase(channel, pattern):
+                    pubsub.messages.put({'type': 'pmessage', 'pattern': pattern, 'channel': channel, 'data': data})
+        return len(subscribers)
+
+    def pubsub(self):
+        return LocalPubSub(self)
+
+
+def build_event_broker():
+
+    """ Build the broker from the API_EVENTS setting """
+
+    config = getattr(settings, 'API_EVENTS', {})
+    if not config.get('ENABLED', True):
+        return None
+    fanout = config.get('FANOUT')
+    return EventBroker(
+        queue_size=config.get('QUEUE_SIZE', 100),
+        fanout=RedisFanout(**fanout) if fanout is not None else None,
+    )
+
+
+event_broker = build_event_broker()
+
+
+def publish_instances(project_id, instances, action):
+
+    """ Publish the events of issues or comments written without signals, by the bulk writes """
+
+    if event_broker is None or not event_broker.wanted(project_id):
+        return
+    for instance in instances:
+        event_broker.publish(project_id, model_event(instance, action))
@@ -0,0 +1,98 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from API.models import Issues, Comments
+
+ISSUE_FIELDS = ('id', 'title', 'description', 'tag', 'priority', 'status', 'issue_author_user_id',
+                'issue_assignee_user_id', 'created_time')
+COMMENT_FIELDS = ('id', 'comments_issue_id', 'description', 'comments_author_user_id', 'created_time')
+CSV_COLUMNS = ('type', 'id', 'comments_issue_id', 'title', 'description', 'tag', 'priority', 'status',
+               'issue_author_user_id', 'issue_assignee_user_id', 'comments_author_user_id', 'created_time')
+
+
+def project_querysets(project_id):
+
+    """ values() querysets of the issues of the project sorted by id, and of their comments sorted by issue """
+
+    issues = Issues.objects.filter(issue_project_id=project_id).order_by('id').values(*ISSUE_FIELDS)
+    comments = Comments.objects.filter(comments_issue_id__issue_project_id=project_id).order_by(
+        'comments_issue_id', 'created_time', 'id').values(*COMMENT_FIELDS)
+    return issues, comments
+
+
+def project_records(project_id, chunk_size):
+
+    """ Yield ('issue', row) / ('comment', row) for every issue of the project followed by its comments.
+    Issues and comments are read with two chunked values() cursors sorted by issue and merged,
+    so the memory used doesn't depend on the size of the project """
+
+    issues, comments = project_querysets(project_id)
+    comments = comments.iterator(chunk_size=chunk_size)
+    comment = next(comments, None)
+    for issue in issues.iterator(chunk_size=chunk_size):
+        yield 'issue', issue
+        while comment is not None and comment['comments_issue_id'] <= issue['id']:
+            if comment['comments_issue_id'] == issue['id']:
+                yield 'comment', comment
+            comment = next(comments, None)
+
+
+async def aproject_records(project_id, chunk_size):
+
+    """ project_records read with the async ORM, for the streaming responses of the ASGI application : Django
+    reads a sync iterator there in one go before sending the first byte """
+
+    issues, comments = project_querysets(project_id)
+    comments = comments.aiterator(chunk_size=chunk_size)
+    comment = await anext(comments, None)
+    async for issue in issues.aiterator(chunk_size=chunk_size):
+        yield 'issue', issue
+        while comment is not None and comment['comments_issue_id'] <= issue['id']:
+            if comment['comments_issue_id'] == issue['id']:
+                yield 'comment', comment
+            comment = await anext(comments, None)
+
+
+def ndjson_line(record_type, row):
+    return json.dumps({'type': record_type, **row}, cls=DjangoJSONEncoder) + '\n'
+
+
+class EchoBuffer:
+
+    """ File-like object returning what is written, used to stream csv.writer rows """
+
+    def write(self, value):
+        return value
+
+
+CSV_WRITER = csv.DictWriter(EchoBuffer(), fieldnames=CSV_COLUMNS)
+
+
+def csv_line(record_type, row):
+    created_time = row['created_time'].isoformat() if row['created_time'] else ''
+    return CSV_WRITER.writerow({**row, 'type': record_type, 'created_time': created_time})
+
+
+# format : (header, line of a record, content type)
+EXPORT_FORMATS = {
+    'ndjson': ('', ndjson_line, 'application/x-ndjson'),
+    'csv': (CSV_WRITER.writeheader(), csv_line, 'text/csv; charset=utf-8'),
+}
+
+
+def export_lines(export_format, records):
+    header, line, _ = EXPORT_FORMATS[export_format]
+    if header:
+        yield header
+    for record_type, row in records:
+        yield line(record_type, row)
+
+
+async def aexport_lines(export_format, records):
+    header, line, _ = EXPORT_FORMATS[export_format]
+    if header:
+        yield header
+    async for record_type, row in records:
+        yield line(record_type, row)
@@ -0,0 +1,102 @@
+""" values() based serializers producing the JSON of the list serializers without building model
+instances nor nested serializers, used by the list actions when API_FAST_LIST_SERIALIZATION is True """
+
+from rest_framework import serializers
+
+from API.models import Projects, Issues
+
+
+class FastListSerializer:
+
+    """ Turn values(*columns) rows into the representation of a list serializer """
+
+    columns = ()
+    datetime_field = serializers.DateTimeField()
+
+    def row(self, values):
+        raise NotImplementedError
+
+    def to_representation(self, rows):
+        return [self.row(values) for values in rows]
+
+    def datetime(self, value):
+        return None if value is None else self.datetime_field.to_representation(value)
+
+    @staticmethod
+    def user(values, prefix):
+        return {
+            'id': values[prefix],
+            'first_name': values[prefix + '__first_name'],
+            'last_name': values[prefix + '__last_name'],
+        }
+
+
+def user_columns(prefix):
+    return prefix, prefix + '__first_name', prefix + '__last_name'
+
+
+class FastIssuesListSerializer(FastListSerializer):
+
+    """ Same output as IssuesListSerializer """
+
+    columns = ('id', 'title', 'description', 'tag', 'priority', 'issue_project_id', 'status', 'created_time',
+               'comment_count', *user_columns('issue_author_user_id'), *user_columns('issue_assignee_user_id'))
+    TAG_LABELS = dict(Issues.TAG_CHOICES)
+    PRIORITY_LABELS = dict(Issues.PRIORITY_CHOICES)
+    STATUS_LABELS = dict(Issues.STATUS_CHOICES)
+
+    def row(self, values):
+        return {
+            'id': values['id'],
+            'title': values['title'],
+            'description': values['description'],
+            'tag_long': self.TAG_LABELS.get(values['tag'], values['tag']),
+            'priority_long': self.PRIORITY_LABELS.get(values['priority'], values['priority']),
+            'issue_project_id': values['issue_project_id'],
+            'status_long': self.STATUS_LABELS.get(values['status'], values['status']),
+            'issue_author_user_id': values['issue_author_user_id'],
+            'issue_author_user': self.user(values, 'issue_author_user_id'),
+            'issue_assignee_user_id': values['issue_assignee_user_id'],
+            'issue_assignee_user': self.user(values, 'issue_assignee_user_id'),
+            'created_time': self.datetime(values['created_time']),
+            'comment_count': values['comment_count'],
+        }
+
+
+class FastCommentsListSerializer(FastListSerializer):
+
+    """ Same output as CommentsListSerializer """
+
+    columns = ('id', 'description', 'comments_issue_id', 'created_time', *user_columns('comments_author_user_id'))
+
+    def row(self, values):
+        return {
+            'id': values['id'],
+            'description': values['description'],
+            'comments_author_user': self.user(values, 'comments_author_user_id'),
+            'comments_author_user_id': values['comments_author_user_id'],
+            'comments_issue_id': values['comments_issue_id'],
+            'created_time': self.datetime(values['created_time']),
+        }
+
+
+class FastProjectsListSerializer(FastListSerializer):
+
+    """ Same output as ProjectsListSerializer """
+
+    columns = ('id', 'title', 'project_type', 'issue_count', 'open_issue_count', 'comment_count', 'contributor_count',
+               *user_columns('project_author_user_id'))
+    PROJECT_TYPE_LABELS = dict(Projects.PROJECT_TYPES)
+
+    def row(self, values):
+        return {
+            'id': values['id'],
+            'title': values['title'],
+            'project_type_long': self.PROJECT_TYPE_LABELS.get(values['project_type'], values['project_type']),
+            'project_author_user_id': values['project_author_user_id'],
+            'project_author_user': self.user(values, 'project_author_user_id'),
+            'issue_count': values['issue_count'],
+            'open_issue_count': values['open_issue_count'],
+            'comment_count': values['comment_count'],
+            'contributor_count': values['contributor_count'],
+        }
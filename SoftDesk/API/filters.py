@@ -0,0 +1,96 @@
+""" Filters of the issues list, read from the query string and validated against the choices of Issues.
+Each filter is served by an index beginning with the project : (project, status, created_time),
+(project, priority, created_time), (project, tag, created_time) and (project, created_time) for the
+created_time range, the user filters by the indexes of the author and assignee foreign keys """
+
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from API.models import Issues
+from API.pagination import IssuesCursorPagination
+
+CHOICE_FILTERS = {
+    'status': Issues.STATUS_CHOICES,
+    'priority': Issues.PRIORITY_CHOICES,
+    'tag': Issues.TAG_CHOICES,
+}
+USER_FILTERS = {
+    'assignee': 'issue_assignee_user_id',
+    'author': 'issue_author_user_id',
+}
+TIME_FILTERS = {
+    'created_after': 'created_time__gte',
+    'created_before': 'created_time__lt',
+}
+
+
+def split_values(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def values_lookup(field, values):
+    return {f'{field}__in': values} if len(values) > 1 else {field: values[0]}
+
+
+def parse_time(value):
+
+    """ Aware datetime of an ISO 8601 date or datetime, a date is read as its midnight, None if it's invalid """
+
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_issues(queryset, params):
+
+    """ Filter queryset by the ?status=, ?priority=, ?tag= (one code or codes separated by commas),
+    ?assignee=, ?author= (user ids) and ?created_after=, ?created_before= (ISO 8601) parameters.
+    Raise a ValidationError listing every invalid parameter, the ?ordering= of the pagination included """
+
+    errors = {}
+    lookups = {}
+    for name, choices in CHOICE_FILTERS.items():
+        if params.get(name) is None:
+            continue
+        values = split_values(params[name])
+        codes = [code for code, label in choices]
+        unknown = [value for value in values if value not in codes]
+        if unknown or not values:
+            errors[name] = [f"Valeurs inconnues : {', '.join(unknown)}. "
+                            f"Choix possibles : {', '.join(f'{code} ({label})' for code, label in choices)}"]
+        else:
+            lookups.update(values_lookup(name, values))
+    for name, field in USER_FILTERS.items():
+        if params.get(name) is None:
+            continue
+        values = split_values(params[name])
+        if not values or not all(value.isdigit() for value in values):
+            errors[name] = ["Veuillez indiquer des identifiants d'utilisateurs séparés par des virgules"]
+        else:
+            lookups.update(values_lookup(field, values))
+    for name, lookup in TIME_FILTERS.items():
+        if params.get(name) is None:
+            continue
+        moment = parse_time(params[name])
+        if moment is None:
+            errors[name] = ["Veuillez indiquer une date ISO 8601, AAAA-MM-JJ ou AAAA-MM-JJTHH:MM:SS"]
+        else:
+            lookups[lookup] = moment
+    ordering_param = IssuesCursorPagination.ordering_param
+    if params.get(ordering_param) is not None:
+        ordering_errors = IssuesCursorPagination.ordering_errors(params[ordering_param])
+        if ordering_errors:
+            errors[ordering_param] = ordering_errors
+    if errors:
+        raise ValidationError(errors)
+    return queryset.filter(**lookups)
@@ -0,0 +1,40 @@
+""" Password hashing off the request path.
+The hashes are computed by a bounded pool of threads (hashlib releases the GIL while hashing) : a burst of
+signups queues up in the pool instead of occupying every worker, and the async views await the hash
+without blocking the event loop """
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+
+PASSWORD_HASHING = getattr(settings, 'API_PASSWORD_HASHING', {})
+
+hashing_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASHING.get('WORKERS', 4),
+                                  thread_name_prefix='password-hashing')
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+
+    """ PBKDF2 hasher whose iterations come from API_PASSWORD_HASHING['ITERATIONS'].
+    It keeps the pbkdf2_sha256 format : the hashes made with another cost are still checked, and upgraded
+    at the next login """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'API_PASSWORD_HASHING', {}).get('ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+def hash_password(password):
+
+    """ Hash the password in the pool, waiting for the result """
+
+    return hashing_pool.submit(make_password, password).result()
+
+
+async def ahash_password(password):
+
+    """ Hash the password in the pool without blocking the event loop """
+
+    return await asyncio.wrap_future(hashing_pool.submit(make_password, password))
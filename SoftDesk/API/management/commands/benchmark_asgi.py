@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, \
+    teardown_test_environment
+
+from API.benchmarks import ENDPOINTS, asgi_throughput, seed_dataset, wsgi_throughput
+from API.cache import response_cache
+
+READ_ENDPOINTS = ('projects-list', 'projects-detail', 'issues-list', 'issues-detail', 'comments-list',
+                  'comments-detail')
+
+
+class Command(BaseCommand):
+
+    """ Compare the throughput of the read routes served by the WSGI viewsets and by the ASGI async views """
+
+    help = "Compare le débit des routes de lecture entre le déploiement WSGI et le déploiement ASGI"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=5)
+        parser.add_argument('--contributors', type=int, default=20, help='Contributeurs par projet')
+        parser.add_argument('--issues', type=int, default=200, help='Problèmes par projet')
+        parser.add_argument('--comments', type=int, default=5, help='Commentaires par problème')
+        parser.add_argument('--requests', type=int, default=300, help='Nombre total de requêtes')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requêtes simultanées')
+        parser.add_argument('--output', default='benchmark-asgi.json', help='Fichier JSON des résultats')
+
+    def handle(self, *args, **options):
+        dataset = {name: options[name] for name in ('projects', 'contributors', 'issues', 'comments')}
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            user, ids = seed_dataset(**dataset)
+            urls = [ENDPOINTS[name].format(**ids) for name in READ_ENDPOINTS]
+            results = {}
+            for name, run in (('wsgi', wsgi_throughput), ('asgi', asgi_throughput)):
+                if response_cache is not None:
+                    response_cache.backend.clear()
+                results[name] = run(user, urls, total=options['requests'], concurrency=options['concurrency'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        with open(options['output'], 'w') as output:
+            json.dump({'dataset': dataset, 'concurrency': options['concurrency'], 'results': results}, output,
+                      indent=2)
+        for name, result in results.items():
+            self.stdout.write(f"{name}  {result['requests_per_second']:>8} req/s  {result['errors']} erreurs")
+        self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {options['output']}"))
@@ -0,0 +1,62 @@
+import json
+import platform
+from datetime import datetime, timezone
+
+import django
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, \
+    teardown_test_environment
+
+from API.benchmarks import ENDPOINTS, authenticated_client, benchmark_endpoints, compare_results, seed_dataset
+
+
+class Command(BaseCommand):
+
+    """ Seed a test database and measure the time, SQL queries and response size of every endpoint """
+
+    help = "Mesure le temps, le nombre de requêtes SQL et la taille des réponses de chaque route de l'API"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=5)
+        parser.add_argument('--contributors', type=int, default=20, help='Contributeurs par projet')
+        parser.add_argument('--issues', type=int, default=200, help='Problèmes par projet')
+        parser.add_argument('--comments', type=int, default=5, help='Commentaires par problème')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--warm-cache', action='store_true',
+                            help='Garde le cache des réponses entre deux mesures')
+        parser.add_argument('--endpoint', action='append', choices=list(ENDPOINTS), dest='endpoints')
+        parser.add_argument('--output', default='benchmark.json', help='Fichier JSON des résultats')
+        parser.add_argument('--compare', help='Fichier JSON d\'une exécution précédente à comparer')
+
+    def handle(self, *args, **options):
+        dataset = {name: options[name] for name in ('projects', 'contributors', 'issues', 'comments')}
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            self.stdout.write(f"Création des données : {dataset}")
+            user, ids = seed_dataset(**dataset)
+            results = benchmark_endpoints(authenticated_client(user), ids, repeat=options['repeat'],
+                                          warm_cache=options['warm_cache'], endpoints=options['endpoints'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': dataset,
+            'repeat': options['repeat'],
+            'warm_cache': options['warm_cache'],
+            'results': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+
+        for name, result in results.items():
+            self.stdout.write(f"{name:<18} {result['status']}  {result['median_ms']:>10.2f} ms  "
+                              f"{result['queries']:>5} requêtes  {result['bytes']:>10} octets")
+        if options['compare']:
+            with open(options['compare']) as previous:
+                self.stdout.write('\n'.join(compare_results(json.load(previous)['results'], results)))
+        self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {options['output']}"))
@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_databases, setup_test_environment, teardown_databases, \
+    teardown_test_environment
+
+from API.benchmarks import signup_throughput
+
+
+class Command(BaseCommand):
+
+    """ Measure the signups per second through the WSGI and the ASGI applications """
+
+    help = "Mesure le nombre d'inscriptions par seconde en WSGI et en ASGI"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help="Nombre d'inscriptions")
+        parser.add_argument('--concurrency', type=int, default=10, help='Inscriptions simultanées')
+        parser.add_argument('--iterations', type=int, help='Coût du hachage PBKDF2 (itérations)')
+        parser.add_argument('--output', default='benchmark-signup.json', help='Fichier JSON des résultats')
+
+    def handle(self, *args, **options):
+        hashing = dict(settings.API_PASSWORD_HASHING)
+        if options['iterations']:
+            hashing['ITERATIONS'] = options['iterations']
+        # concurrent INSERTs fail on the shared in-memory test database, a file waits for the lock instead
+        directory = tempfile.TemporaryDirectory()
+        connection.settings_dict['TEST']['NAME'] = os.path.join(directory.name, 'benchmark.sqlite3')
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(API_PASSWORD_HASHING=hashing):
+                results = {
+                    name: signup_throughput(options['requests'], options['concurrency'], asgi=name == 'asgi')
+                    for name in ('wsgi', 'asgi')
+                }
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+            directory.cleanup()
+
+        with open(options['output'], 'w') as output:
+            json.dump({'iterations': hashing['ITERATIONS'], 'workers': hashing['WORKERS'],
+                       'concurrency': options['concurrency'], 'results': results}, output, indent=2)
+        for name, result in results.items():
+            self.stdout.write(f"{name}  {result['requests_per_second']:>8} inscriptions/s  {result['errors']} erreurs")
+        self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {options['output']}"))
@@ -0,0 +1,37 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from API.benchmarks import concurrent_writes, temporary_database
+
+PROFILES = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3'},
+    'production': settings.SQLITE_PRODUCTION_DATABASE,
+}
+
+
+class Command(BaseCommand):
+
+    """ Measure concurrent write transactions on a new SQLite file with the default settings of Django and with
+    the production profile """
+
+    help = "Mesure les transactions d'écriture simultanées sur SQLite, profil par défaut et profil de production"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help="Nombre d'écrivains simultanés")
+        parser.add_argument('--transactions', type=int, default=50, help="Transactions par écrivain")
+        parser.add_argument('--output', default='benchmark-sqlite-writers.json', help='Fichier JSON des résultats')
+
+    def handle(self, *args, **options):
+        results = {}
+        for name, profile in PROFILES.items():
+            with temporary_database(f'benchmark_{name}', profile) as alias:
+                results[name] = concurrent_writes(alias, options['writers'], options['transactions'])
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+        for name, result in results.items():
+            self.stdout.write(f"{name:<11} {result['transactions_per_second']:>8} transactions/s  "
+                              f"{result['errors']} erreurs ({result['error_rate']:.1%})")
+        self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {options['output']}"))
@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, \
+    teardown_test_environment
+
+from API.benchmarks import ENDPOINTS, authenticated_client, benchmark_user_cache, seed_dataset
+
+READ_ENDPOINTS = ('projects-list', 'projects-detail', 'issues-list', 'issues-detail', 'comments-list',
+                  'comments-detail')
+
+
+class Command(BaseCommand):
+
+    """ Measure the read routes with and without the user of the token found in the user cache """
+
+    help = "Mesure les requêtes SQL et le temps gagnés par le cache des utilisateurs authentifiés"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=2)
+        parser.add_argument('--contributors', type=int, default=20, help='Contributeurs par projet')
+        parser.add_argument('--issues', type=int, default=50, help='Problèmes par projet')
+        parser.add_argument('--comments', type=int, default=5, help='Commentaires par problème')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--output', default='benchmark-user-cache.json', help='Fichier JSON des résultats')
+
+    def handle(self, *args, **options):
+        dataset = {name: options[name] for name in ('projects', 'contributors', 'issues', 'comments')}
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            user, ids = seed_dataset(**dataset)
+            urls = [ENDPOINTS[name].format(**ids) for name in READ_ENDPOINTS]
+            results = benchmark_user_cache(authenticated_client(user), urls, repeat=options['repeat'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        with open(options['output'], 'w') as output:
+            json.dump({'dataset': dataset, 'repeat': options['repeat'], 'results': results}, output, indent=2)
+        for url, result in results.items():
+            self.stdout.write(f"{url:<40} {result['cold']['median_ms']:>8.2f} ms -> "
+                              f"{result['warm']['median_ms']:>8.2f} ms  requêtes {result['cold']['queries']} -> "
+                              f"{result['warm']['queries']}")
+        self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {options['output']}"))
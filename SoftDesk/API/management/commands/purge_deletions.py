@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from API.models import Deletions
+
+
+class Command(BaseCommand):
+
+    """ Delete the tombstones older than API_CHANGES['TOMBSTONE_RETENTION'] days, the delta sync refuses the
+    cursors older than that """
+
+    help = "Supprime les traces des suppressions plus anciennes que la durée de conservation"
+
+    def handle(self, *args, **options):
+        limit = timezone.now() - timedelta(days=settings.API_CHANGES['TOMBSTONE_RETENTION'])
+        count, _ = Deletions.objects.filter(deleted_time__lt=limit).delete()
+        self.stdout.write(self.style.SUCCESS(f"{count} trace(s) de suppression supprimée(s)"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from API.search import search_backend
+
+
+class Command(BaseCommand):
+
+    """ Rebuild the full-text index of the issues and comments from the database """
+
+    help = "Reconstruit l'index de recherche des problèmes et commentaires"
+
+    def handle(self, *args, **options):
+        if search_backend is None:
+            raise CommandError("La recherche n'est pas activée (API_SEARCH_BACKEND)")
+        search_backend.rebuild()
+        self.stdout.write(self.style.SUCCESS("Index de recherche reconstruit"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from API.counters import find_drift, recount
+from API.models import Issues
+from API.signals import project_changed
+
+
+class Command(BaseCommand):
+
+    """ Check the counters of the projects and issues against the rows, and repair them """
+
+    help = "Vérifie les compteurs des projets et des problèmes et les recalcule"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Signale les compteurs faux sans les corriger, en échec s\'il y en a')
+
+    def handle(self, *args, **options):
+        drift = find_drift()
+        for kind, rows in drift.items():
+            for object_id, field, stored, actual in rows:
+                self.stdout.write(f"{kind} {object_id} {field} : {stored} au lieu de {actual}")
+        if not any(drift.values()):
+            self.stdout.write(self.style.SUCCESS("Les compteurs sont à jour"))
+            return
+        if options['check']:
+            raise CommandError("Des compteurs sont faux, lancez recount_counters pour les corriger")
+        project_ids = {object_id for object_id, *_ in drift['projects']}
+        project_ids.update(Issues.objects.filter(
+            pk__in={object_id for object_id, *_ in drift['issues']}
+        ).values_list('issue_project_id', flat=True))
+        recount(project_ids)
+        for project_id in project_ids:
+            project_changed(project_id)
+        self.stdout.write(self.style.SUCCESS(f"Compteurs recalculés pour {len(project_ids)} projet(s)"))
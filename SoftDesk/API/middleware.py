@@ -0,0 +1,180 @@
+import asyncio
+import contextvars
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('API.timing')
+
+current_metrics = contextvars.ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+
+    """ Measures collected while a request is processed """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = ''
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook, called for every statement
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.sql_time += elapsed
+            if elapsed > self.slowest_time:
+                self.slowest_time = elapsed
+                self.slowest_sql = sql
+
+
+@contextmanager
+def serializer_timer():
+
+    """ Add the time spent in the block to the serializer time of the request.
+    Only the outermost serializer is timed, nested ones are part of it """
+
+    metrics = current_metrics.get()
+    if metrics is None or metrics.serializer_depth:
+        yield
+        return
+    metrics.serializer_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_time += time.perf_counter() - start
+        metrics.serializer_depth -= 1
+
+
+def route_basename(request):
+
+    """ Return the router basename of the view (projects, issues, comments, users) or the URL name """
+
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    initkwargs = getattr(match.func, 'initkwargs', None) or {}
+    return initkwargs.get('basename') or match.url_name
+
+
+class RequestTimingMiddleware:
+
+    """ Report the SQL queries, serializer time and total time of each request in Server-Timing headers
+    and in a log line. Disabled unless the API_REQUEST_TIMING setting is True """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'API_REQUEST_TIMING', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token, start = self.start()
+        try:
+            with self.wrap_connections(metrics):
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.report(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics, token, start = self.start()
+        try:
+            with self.wrap_connections(metrics):
+                response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.report(request, response, metrics, start)
+
+    @staticmethod
+    def start():
+        metrics = RequestMetrics()
+        return metrics, current_metrics.set(metrics), time.perf_counter()
+
+    @staticmethod
+    def wrap_connections(metrics):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        return stack
+
+    @staticmethod
+    def report(request, response, metrics, start):
+        total_time = time.perf_counter() - start
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.sql_time * 1000:.2f};desc="{metrics.queries} queries"',
+            f'db-slowest;dur={metrics.slowest_time * 1000:.2f}',
+            f'serializer;dur={metrics.serializer_time * 1000:.2f}',
+            f'total;dur={total_time * 1000:.2f}',
+        ])
+        logger.info(json.dumps({
+            'route': route_basename(request),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'sql_ms': round(metrics.sql_time * 1000, 3),
+            'slowest_sql_ms': round(metrics.slowest_time * 1000, 3),
+            'slowest_sql': metrics.slowest_sql,
+            'serializer_ms': round(metrics.serializer_time * 1000, 3),
+            'total_ms': round(total_time * 1000, 3),
+        }))
+        return response
+
+
+class DisconnectWatcher:
+
+    """ ASGI middleware putting in the scope of the HTTP requests an asyncio.Event set when the client
+    disconnects ('softdesk.disconnected'). The handler of Django 4.2 stops reading the messages of the client
+    once it has the body, and the ASGI servers drop the writes to a closed connection without an error : a
+    stream can't tell its client left otherwise """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.application(scope, receive, send)
+        disconnected = scope['softdesk.disconnected'] = asyncio.Event()
+        body_read = asyncio.Event()
+
+        async def receive_body():
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                disconnected.set()
+            elif not message.get('more_body', False):
+                body_read.set()
+            return message
+
+        async def listen():
+            # the messages after the body are only read here
+            await body_read.wait()
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        listener = asyncio.ensure_future(listen())
+        try:
+            await self.application(scope, receive_body, send)
+        finally:
+            listener.cancel()
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.2 on 2026-10-18 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("API", "0006_alter_contributors_permission_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comments",
+            index=models.Index(
+                fields=["comments_issue_id", "created_time"],
+                name="comment_issue_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="contributors",
+            index=models.Index(
+                fields=[
+                    "contributors_user_id",
+                    "contributors_project_id",
+                    "permission",
+                ],
+                name="contributor_user_project_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="issues",
+            index=models.Index(
+                fields=["issue_project_id", "status", "created_time"],
+                name="issue_project_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="issues",
+            index=models.Index(
+                fields=["issue_assignee_user_id", "status"],
+                name="issue_assignee_status_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS API_search_index USING fts5("
+        "kind UNINDEXED, object_id UNINDEXED, project_id UNINDEXED, issue_id UNINDEXED, "
+        "title, body, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO API_search_index "
+        "(rowid, kind, object_id, project_id, issue_id, title, body) "
+        "SELECT 2 * id, 'issue', id, issue_project_id_id, id, title, description "
+        'FROM "API_issues"'
+    )
+    schema_editor.execute(
+        "INSERT INTO API_search_index "
+        "(rowid, kind, object_id, project_id, issue_id, title, body) "
+        "SELECT 2 * c.id + 1, 'comment', c.id, i.issue_project_id_id, i.id, '', c.description "
+        'FROM "API_comments" c INNER JOIN "API_issues" i ON i.id = c.comments_issue_id_id'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS API_search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("API", "0007_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
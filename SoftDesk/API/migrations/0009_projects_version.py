@@ -0,0 +1,18 @@
+# Generated by Django 4.2.2 on 2026-10-18 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("API", "0008_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="projects",
+            name="version",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
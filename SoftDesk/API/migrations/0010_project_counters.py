@@ -0,0 +1,57 @@
+# Generated by Django 4.2.2 on 2026-10-18 08:45
+
+from django.db import migrations, models
+
+
+def count_existing_rows(apps, schema_editor):
+    schema_editor.execute(
+        'UPDATE "API_issues" SET comment_count = ('
+        'SELECT COUNT(*) FROM "API_comments" c WHERE c.comments_issue_id_id = "API_issues".id)'
+    )
+    schema_editor.execute(
+        'UPDATE "API_projects" SET '
+        'issue_count = (SELECT COUNT(*) FROM "API_issues" i '
+        'WHERE i.issue_project_id_id = "API_projects".id), '
+        'open_issue_count = (SELECT COUNT(*) FROM "API_issues" i '
+        "WHERE i.issue_project_id_id = \"API_projects\".id AND i.status <> 'T'), "
+        'comment_count = (SELECT COALESCE(SUM(i.comment_count), 0) FROM "API_issues" i '
+        'WHERE i.issue_project_id_id = "API_projects".id), '
+        'contributor_count = (SELECT COUNT(*) FROM "API_contributors" c '
+        'WHERE c.contributors_project_id_id = "API_projects".id)'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("API", "0009_projects_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="issues",
+            name="comment_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="projects",
+            name="comment_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="projects",
+            name="contributor_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="projects",
+            name="issue_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="projects",
+            name="open_issue_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.2 on 2026-10-18 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("API", "0010_project_counters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="issues",
+            index=models.Index(
+                fields=[
+                    "issue_project_id",
+                    "status",
+                    "priority",
+                    "tag",
+                    "issue_assignee_user_id",
+                ],
+                name="issue_project_stats_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.2 on 2026-10-18 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("API", "0011_issue_project_stats_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="issues",
+            index=models.Index(
+                fields=["issue_project_id", "created_time"],
+                name="issue_project_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="issues",
+            index=models.Index(
+                fields=["issue_project_id", "priority", "created_time"],
+                name="issue_project_priority_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="issues",
+            index=models.Index(
+                fields=["issue_project_id", "tag", "created_time"],
+                name="issue_project_tag_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 4.2.2 on 2026-10-18 08:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("API", "0012_issue_list_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Deletions",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("deleted_project_id", models.IntegerField()),
+                (
+                    "model",
+                    models.CharField(
+                        choices=[
+                            ("contributors", "Contributeur"),
+                            ("issues", "Problème"),
+                            ("comments", "Commentaire"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("object_id", models.IntegerField()),
+                ("deleted_time", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="comments",
+            name="updated_time",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="contributors",
+            name="updated_time",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="issues",
+            name="updated_time",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="projects",
+            name="updated_time",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="comments",
+            index=models.Index(fields=["updated_time"], name="comment_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="contributors",
+            index=models.Index(
+                fields=["contributors_project_id", "updated_time"],
+                name="contributor_project_sync_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="issues",
+            index=models.Index(
+                fields=["issue_project_id", "updated_time"],
+                name="issue_project_sync_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="deletions",
+            index=models.Index(
+                fields=["deleted_project_id", "deleted_time"],
+                name="deletion_project_time_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.2 on 2026-10-18 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("API", "0013_sync_changes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="comments",
+            name="comment_updated_idx",
+        ),
+        migrations.AddIndex(
+            model_name="comments",
+            index=models.Index(
+                fields=["comments_issue_id", "updated_time"],
+                name="comment_issue_updated_idx",
+            ),
+        ),
+    ]
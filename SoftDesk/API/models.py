@@ -13,7 +13,26 @@ class Users(AbstractUser):
     USERNAME_FIELD = 'email'
 
 
-class Projects(models.Model):
+class IncrementedFieldsModel(models.Model):
+
+    """ Model whose incremented_fields are only written with F() updates : a save() of an instance
+    leaves them alone instead of overwriting them with the values read before """
+
+    incremented_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and 'update_fields' not in kwargs:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.incremented_fields
+                                       and field.attname not in deferred]
+        super().save(*args, **kwargs)
+
+
+class Projects(IncrementedFieldsModel):
 
     # Model for project
 
@@ -32,6 +51,16 @@ class Projects(models.Model):
         on_delete=models.CASCADE,
         related_name='project_author_user_id'
     )
+    # increased on every change of the project, its contributors, issues or comments (see API.signals)
+    version = models.PositiveBigIntegerField(default=0, editable=False)
+    # kept up to date by API.signals and the bulk writes, recomputed by the recount_counters command
+    issue_count = models.IntegerField(default=0, editable=False)
+    open_issue_count = models.IntegerField(default=0, editable=False)
+    comment_count = models.IntegerField(default=0, editable=False)
+    contributor_count = models.IntegerField(default=0, editable=False)
+    updated_time = models.DateTimeField(auto_now=True)
+
+    incremented_fields = ('version', 'issue_count', 'open_issue_count', 'comment_count', 'contributor_count')
 
 
 class Contributors(models.Model):
@@ -64,15 +93,27 @@ class Contributors(models.Model):
     )
     permission = models.CharField(max_length=2, choices=PERMISSION_CHOICES)
     role = models.CharField(max_length=2, choices=ROLE_CHOICES)
+    updated_time = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = (
             'contributors_user_id',
             'contributors_project_id'
         )
+        indexes = [
+            models.Index(
+                fields=['contributors_user_id', 'contributors_project_id', 'permission'],
+                name='contributor_user_project_idx'
+            ),
+            # delta sync of the project (see API.changes)
+            models.Index(
+                fields=['contributors_project_id', 'updated_time'],
+                name='contributor_project_sync_idx'
+            ),
+        ]
 
 
-class Issues(models.Model):
+class Issues(IncrementedFieldsModel):
 
     # Model for issues
 
@@ -91,6 +132,7 @@ class Issues(models.Model):
         ('E', 'En cours'),
         ('T', 'Terminé')
     )
+    TERMINE = 'T'
 
     title = models.CharField(max_length=128)
     description = models.CharField(max_length=8192)
@@ -113,6 +155,56 @@ class Issues(models.Model):
         related_name='issue_assignee_user_id'
     )
     created_time = models.DateTimeField(auto_now_add=True)
+    comment_count = models.IntegerField(default=0, editable=False)
+    updated_time = models.DateTimeField(auto_now=True)
+
+    incremented_fields = ('comment_count',)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['issue_project_id', 'status', 'created_time'],
+                name='issue_project_status_idx'
+            ),
+            models.Index(
+                fields=['issue_assignee_user_id', 'status'],
+                name='issue_assignee_status_idx'
+            ),
+            # covers the GROUP BY of the project statistics (see API.stats)
+            models.Index(
+                fields=['issue_project_id', 'status', 'priority', 'tag', 'issue_assignee_user_id'],
+                name='issue_project_stats_idx'
+            ),
+            # filters and orderings of the issues list (see API.filters)
+            models.Index(
+                fields=['issue_project_id', 'created_time'],
+                name='issue_project_created_idx'
+            ),
+            models.Index(
+                fields=['issue_project_id', 'priority', 'created_time'],
+                name='issue_project_priority_idx'
+            ),
+            models.Index(
+                fields=['issue_project_id', 'tag', 'created_time'],
+                name='issue_project_tag_idx'
+            ),
+            # delta sync of the project (see API.changes)
+            models.Index(
+                fields=['issue_project_id', 'updated_time'],
+                name='issue_project_sync_idx'
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # the status read from the database, so a save can tell if the issue was opened or closed
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_status = instance.__dict__.get('status')
+        return instance
+
+    @property
+    def is_open(self):
+        return self.status != self.TERMINE
 
 
 class Comments(models.Model):
@@ -131,3 +223,43 @@ class Comments(models.Model):
         related_name='comments_issue_id'
     )
     created_time = models.DateTimeField(auto_now_add=True)
+    updated_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['comments_issue_id', 'created_time'],
+                name='comment_issue_created_idx'
+            ),
+            # delta sync of the projects (see API.changes), the comments have no project column : they are
+            # read issue by issue, from the issues of the project
+            models.Index(
+                fields=['comments_issue_id', 'updated_time'],
+                name='comment_issue_updated_idx'
+            ),
+        ]
+
+
+class Deletions(models.Model):
+
+    # Tombstone of a deleted contributor, issue or comment, read by the delta sync (see API.changes)
+
+    MODEL_CHOICES = (
+        ('contributors', 'Contributeur'),
+        ('issues', 'Problème'),
+        ('comments', 'Commentaire')
+    )
+
+    # not a foreign key : the tombstones of a project are deleted after it (see API.signals)
+    deleted_project_id = models.IntegerField()
+    model = models.CharField(max_length=16, choices=MODEL_CHOICES)
+    object_id = models.IntegerField()
+    deleted_time = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['deleted_project_id', 'deleted_time'],
+                name='deletion_project_time_idx'
+            ),
+        ]
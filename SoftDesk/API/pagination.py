@@ -0,0 +1,194 @@
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
+
+class IdCursorPagination(CursorPagination):
+
+    """ Keyset pagination on the primary key, used for projects and contributors """
+
+    ordering = ('id',)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+
+    async def apaginate_queryset(self, queryset, request):
+
+        """ paginate_queryset of CursorPagination, fetching the page with the async ORM """
+
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, None)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            order = self.ordering[0]
+            order_attr = order.lstrip('-')
+            if self.cursor.reverse != order.startswith('-'):
+                queryset = queryset.filter(**{order_attr + '__lt': current_position})
+            else:
+                queryset = queryset.filter(**{order_attr + '__gt': current_position})
+
+        results = [item async for item in queryset[offset:offset + self.page_size + 1]]
+        self.page = results[:self.page_size]
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+        return self.page
+
+    def get_paginated_data(self, data):
+        return {'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data}
+
+
+class CreatedTimeCursorPagination(IdCursorPagination):
+
+    """ Keyset pagination on (created_time, id), used for issues and comments """
+
+    ordering = ('created_time', 'id')
+
+
+class IssuesCursorPagination(CreatedTimeCursorPagination):
+
+    """ Pagination of the issues list, ordered by ?ordering=created_time (default), -created_time, priority
+    (FAIBLE first) or -priority (ÉLEVÉE first), then by created_time.
+    The priority orderings read the priorities one after the other from the (project, priority, created_time)
+    index : their cursor is the (priority, created_time, id) of the last issue of the page, and there is no
+    previous link """
+
+    ordering_param = 'ordering'
+    orderings = {'created_time': ('created_time', 'id'), '-created_time': ('-created_time', '-id')}
+    priority_orderings = {'priority': ('F', 'M', 'E'), '-priority': ('E', 'M', 'F')}
+
+    @classmethod
+    def ordering_errors(cls, value):
+
+        """ Error messages of the ?ordering= value, empty when it's valid """
+
+        if value in cls.orderings or value in cls.priority_orderings:
+            return []
+        choices = ', '.join([*cls.orderings, *cls.priority_orderings])
+        return [f"Tri inconnu : {value}. Tris possibles : {choices}"]
+
+    def get_ordering(self, request, queryset, view):
+        value = request.query_params.get(self.ordering_param, 'created_time')
+        errors = self.ordering_errors(value)
+        if errors:
+            raise ValidationError({self.ordering_param: errors})
+        if value in self.priority_orderings:
+            return ('priority', 'created_time', 'id')
+        return self.orderings[value]
+
+    def get_priorities(self, request):
+        return self.priority_orderings.get(request.query_params.get(self.ordering_param))
+
+    def decode_position(self, request, priorities):
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            return None
+        try:
+            priority, created_time, pk = self.cursor.position.split(' ')
+            position = (priority, parse_datetime(created_time), int(pk))
+        except (AttributeError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if priority not in priorities or position[1] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    @staticmethod
+    def priority_querysets(queryset, priorities, position):
+
+        """ Querysets of the issues following position, one by priority in the order of priorities """
+
+        start = priorities.index(position[0]) if position else 0
+        for priority in priorities[start:]:
+            issues = queryset.filter(priority=priority).order_by('created_time', 'id')
+            if position and priority == position[0]:
+                issues = issues.filter(Q(created_time__gt=position[1]) | Q(created_time=position[1],
+                                                                             id__gt=position[2]))
+            yield issues
+
+    @staticmethod
+    def value_of(issue, field):
+        # the fast list serializer paginates values() rows
+        return issue[field] if isinstance(issue, dict) else getattr(issue, field)
+
+    def start_page(self, request, queryset):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, None)
+        self.priorities = self.get_priorities(request)
+
+    def end_page(self, results):
+        self.page = results[:self.page_size]
+        self.has_next = len(results) > self.page_size
+        self.has_previous = False
+        if self.has_next:
+            priority, created_time, pk = [self.value_of(self.page[-1], field) for field in self.ordering]
+            self.next_position = f'{priority} {created_time.isoformat()} {pk}'
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.start_page(request, queryset)
+        if self.priorities is None:
+            return super().paginate_queryset(queryset, request, view)
+        results = []
+        for issues in self.priority_querysets(queryset, self.priorities, self.decode_position(request,
+                                                                                              self.priorities)):
+            results += issues[:self.page_size + 1 - len(results)]
+            if len(results) > self.page_size:
+                break
+        return self.end_page(results)
+
+    async def apaginate_queryset(self, queryset, request):
+        self.start_page(request, queryset)
+        if self.priorities is None:
+            return await super().apaginate_queryset(queryset, request)
+        results = []
+        for issues in self.priority_querysets(queryset, self.priorities, self.decode_position(request,
+                                                                                              self.priorities)):
+            results += [issue async for issue in issues[:self.page_size + 1 - len(results)]]
+            if len(results) > self.page_size:
+                break
+        return self.end_page(results)
+
+    def get_next_link(self):
+        if self.priorities is None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if self.priorities is None:
+            return super().get_previous_link()
+        return None
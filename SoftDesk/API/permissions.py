@@ -1,20 +1,55 @@
+from django.db.models import F
 from rest_framework import permissions
 from rest_framework.permissions import BasePermission
 from API.models import Contributors
 
 
+def get_project_membership(request, project_id):
+
+    """ Return the Contributors row (permission / role, and the project version as project_version)
+    linking the user to the project, or None.
+    The lookup uses the (user, project) unique index and is memoized on the request so every
+    permission check of a request shares one query per project """
+
+    http_request = getattr(request, '_request', request)
+    memberships = getattr(http_request, '_project_memberships', None)
+    if memberships is None:
+        memberships = {}
+        http_request._project_memberships = memberships
+    key = str(project_id)
+    if key not in memberships:
+        user = request.user
+        if user is None or not user.is_authenticated or not key.isdigit():
+            memberships[key] = None
+        else:
+            memberships[key] = Contributors.objects.filter(
+                contributors_project_id=key,
+                contributors_user_id=user.pk
+            ).only('id', 'permission', 'role').annotate(
+                project_version=F('contributors_project_id__version')
+            ).first()
+    return memberships[key]
+
+
+def is_project_member(request, project_id):
+
+    """ True if the user contributes to the project """
+
+    return get_project_membership(request, project_id) is not None
+
+
+def is_project_owner(request, project_id):
+
+    """ True if the user has the complete permission on the project """
+
+    membership = get_project_membership(request, project_id)
+    return membership is not None and membership.permission == Contributors.COMPLETE
+
+
 class ProjectPermissions(BasePermission):
 
     """ Permission used to manage the project """
     def has_object_permission(self, request, view, obj):
-        contrib = []
-        contributorspermissions = Contributors.objects.filter(contributors_project_id=obj)
-        for contributorperm in contributorspermissions:
-            contrib.append(contributorperm.contributors_user_id)
-        ownerpermissions = Contributors.objects.filter(contributors_project_id=obj).filter(permission='CP')
-        for ownerpermission in ownerpermissions:
-            owner = ownerpermission.contributors_user_id
-        if request.method in permissions.SAFE_METHODS and request.user in contrib:
-            return True
-        if request.method not in permissions.SAFE_METHODS and request.user == owner:
-            return True
+        if request.method in permissions.SAFE_METHODS:
+            return is_project_member(request, obj.pk)
+        return is_project_owner(request, obj.pk)
@@ -0,0 +1,234 @@
+import base64
+import html
+import json
+
+from django.conf import settings
+from django.core import checks
+from django.db import connection
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+from API.models import Issues, Comments
+
+
+class SearchBackend:
+
+    """ Full-text index of the issues and comments.
+    A backend keeps the index in sync with index_issues / index_comments / remove / remove_issue / remove_project
+    and answers search(). vendors are the database vendors it works with, None for any """
+
+    vendors = None
+
+    def index_issues(self, issues):
+        raise NotImplementedError
+
+    def index_comments(self, comments):
+        raise NotImplementedError
+
+    def remove(self, kind, object_id):
+        raise NotImplementedError
+
+    def remove_issue(self, issue_id):
+        """ Remove the issue and its comments, called before they are deleted """
+        raise NotImplementedError
+
+    def remove_project(self, project_id):
+        """ Remove the issues and comments of the project, called before they are deleted """
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, user_id, query, cursor=None, limit=20):
+        """ Return (results, next_cursor) for the issues and comments of the projects of the user,
+        raise a NotFound if the cursor is invalid """
+        raise NotImplementedError
+
+
+def encode_cursor(rank, rowid):
+    return base64.urlsafe_b64encode(json.dumps([rank, rowid]).encode()).decode()
+
+
+def decode_cursor(cursor):
+
+    """ (rank, rowid) of a cursor returned by encode_cursor, raise a NotFound if it's invalid """
+
+    try:
+        rank, rowid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(rowid)
+    except (ValueError, TypeError):
+        raise NotFound(CursorPagination.invalid_cursor_message)
+
+
+# around the matches in the snippets, control characters can't come from the escaping of the text
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+def highlight(snippet):
+
+    """ HTML of a snippet : the indexed text escaped, the matches in <mark> """
+
+    return html.escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def fts_query(query):
+
+    """ Turn the text typed by the user into an FTS5 query : every word must match, as a prefix """
+
+    terms = ['"' + term.replace('"', '""') + '"*' for term in query.split()]
+    return ' '.join(terms)
+
+
+class SQLiteFTSBackend(SearchBackend):
+
+    """ Index stored in the FTS5 virtual table API_search_index (see migration 0008).
+    The rowid is 2 * id for an issue and 2 * id + 1 for a comment.
+    The cursor of the next page is the (bm25 score, rowid) of the last result. bm25 depends on the statistics of
+    the whole index (number of rows, average lengths), so a write to the index between two pages moves the scores
+    of the rows already ranked : a result may then be repeated or skipped around the page boundary. The pages
+    are consistent while the index doesn't change, a client needing the exact list reads it again from the
+    first page """
+
+    table = 'API_search_index'
+    # migration 0008 only creates the FTS5 table on SQLite
+    vendors = ('sqlite',)
+    KINDS = {'issue': 0, 'comment': 1}
+
+    def rowid(self, kind, object_id):
+        return 2 * object_id + self.KINDS[kind]
+
+    def index_issues(self, issues):
+        self._replace([
+            (self.rowid('issue', issue.pk), 'issue', issue.pk, issue.issue_project_id_id, issue.pk,
+             issue.title, issue.description)
+            for issue in issues
+        ])
+
+    def index_comments(self, comments):
+        comments = list(comments)
+        issues = dict(Issues.objects.filter(
+            pk__in={comment.comments_issue_id_id for comment in comments}
+        ).values_list('pk', 'issue_project_id'))
+        self._replace([
+            (self.rowid('comment', comment.pk), 'comment', comment.pk, issues.get(comment.comments_issue_id_id),
+             comment.comments_issue_id_id, '', comment.description)
+            for comment in comments
+        ])
+
+    def _replace(self, rows):
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, kind, object_id, project_id, issue_id, title, body) '
+                f'VALUES (%s, %s, %s, %s, %s, %s, %s)',
+                rows
+            )
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [self.rowid(kind, object_id)])
+
+    # the rowids are read from the indexes of the issues and comments, project_id and issue_id aren't indexed
+
+    def remove_issue(self, issue_id):
+        comments = Comments._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid IN (SELECT 2 * %s UNION ALL '
+                f'SELECT 2 * id + 1 FROM "{comments}" WHERE comments_issue_id_id = %s)',
+                [issue_id, issue_id]
+            )
+
+    def remove_project(self, project_id):
+        issues = Issues._meta.db_table
+        comments = Comments._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid IN ('
+                f'SELECT 2 * id FROM "{issues}" WHERE issue_project_id_id = %s UNION ALL '
+                f'SELECT 2 * c.id + 1 FROM "{comments}" c INNER JOIN "{issues}" i ON i.id = c.comments_issue_id_id '
+                f'WHERE i.issue_project_id_id = %s)',
+                [project_id, project_id]
+            )
+
+    def rebuild(self):
+        issues = Issues._meta.db_table
+        comments = Comments._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, kind, object_id, project_id, issue_id, title, body) '
+                f'SELECT 2 * id, \'issue\', id, issue_project_id_id, id, title, description FROM "{issues}"'
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, kind, object_id, project_id, issue_id, title, body) '
+                f'SELECT 2 * c.id + 1, \'comment\', c.id, i.issue_project_id_id, i.id, \'\', c.description '
+                f'FROM "{comments}" c INNER JOIN "{issues}" i ON i.id = c.comments_issue_id_id'
+            )
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+
+    def search(self, user_id, query, cursor=None, limit=20):
+        match = fts_query(query)
+        if not match:
+            return [], None
+        # title hits weigh more than description hits, lower bm25 is better
+        sql = (
+            f"SELECT rowid, kind, object_id, project_id, issue_id, title, "
+            f"snippet({self.table}, -1, %s, %s, '…', 16), "
+            f"bm25({self.table}, 0, 0, 0, 0, 10.0, 1.0) AS score "
+            f"FROM {self.table} WHERE {self.table} MATCH %s "
+            f"AND project_id IN (SELECT contributors_project_id_id FROM API_contributors "
+            f"WHERE contributors_user_id_id = %s) "
+        )
+        params = [MARK_START, MARK_END, match, user_id]
+        position = decode_cursor(cursor) if cursor else None
+        if position is not None:
+            sql += "AND (score > %s OR (score = %s AND rowid > %s)) "
+            params += [position[0], position[0], position[1]]
+        sql += "ORDER BY score, rowid LIMIT %s"
+        params.append(limit + 1)
+        with connection.cursor() as db_cursor:
+            db_cursor.execute(sql, params)
+            rows = db_cursor.fetchall()
+        next_cursor = encode_cursor(rows[limit - 1][7], rows[limit - 1][0]) if len(rows) > limit else None
+        results = [{
+            'type': kind,
+            'id': object_id,
+            'project_id': project_id,
+            'issue_id': issue_id,
+            'title': title,
+            'snippet': highlight(snippet),
+            'score': round(-score, 6),
+        } for _, kind, object_id, project_id, issue_id, title, snippet, score in rows[:limit]]
+        return results, next_cursor
+
+
+def build_search_backend():
+
+    """ Build the search backend named by the API_SEARCH_BACKEND setting, None if search is disabled """
+
+    backend = getattr(settings, 'API_SEARCH_BACKEND', None)
+    if not backend:
+        return None
+    return import_string(backend)()
+
+
+search_backend = build_search_backend()
+
+
+@checks.register()
+def check_search_backend(app_configs, **kwargs):
+
+    """ API_SEARCH_BACKEND must work with the vendor of the default database """
+
+    if search_backend is None or search_backend.vendors is None or connection.vendor in search_backend.vendors:
+        return []
+    return [checks.Error(
+        f"{settings.API_SEARCH_BACKEND} ne fonctionne pas avec la base de données {connection.vendor}",
+        hint="Choisissez un API_SEARCH_BACKEND adapté à la base de données, ou None pour désactiver la recherche",
+        obj='API_SEARCH_BACKEND',
+        id='API.E001',
+    )]
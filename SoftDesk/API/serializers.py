@@ -1,22 +1,51 @@
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
+from django.db.models import Prefetch
+from django.urls import reverse
 from rest_framework import serializers
+from rest_framework.pagination import Cursor
+from API.hashing import hash_password
+from API.middleware import current_metrics, serializer_timer
 from API.models import Users, Projects, Contributors, Issues, Comments
+from API.pagination import CreatedTimeCursorPagination
 from rest_framework.validators import UniqueValidator
 
 
+class TimedListSerializer(serializers.ListSerializer):
+
+    """ ListSerializer timing the representation of all its rows at once (see API.middleware) """
+
+    @property
+    def data(self):
+        if current_metrics.get() is None:
+            return super().data
+        with serializer_timer():
+            return super().data
+
+
 class DynamicFieldsModelSerializer(serializers.ModelSerializer):
     """
     A ModelSerializer that takes an additional `fields` argument that
     controls which fields should be displayed.
+    `requested_fields` are the fields selected by a client with ?fields=, the write-only codes of
+    `selectable_codes` among them are displayed too.
     """
 
+    selectable_codes = ()
+
     def __init__(self, *args, **kwargs):
         # Don't pass the 'fields' arg up to the superclass
         fields = kwargs.pop('fields', None)
+        requested_fields = kwargs.pop('requested_fields', None)
 
         # Instantiate the superclass normally
         super().__init__(*args, **kwargs)
 
+        if requested_fields is not None:
+            fields = requested_fields
+            for field_name in set(requested_fields) & set(self.selectable_codes):
+                self.fields[field_name].write_only = False
+
         if fields is not None:
             # Drop any fields that are not specified in the `fields` argument.
             allowed = set(fields)
@@ -24,6 +53,23 @@ class DynamicFieldsModelSerializer(serializers.ModelSerializer):
             for field_name in existing - allowed:
                 self.fields.pop(field_name)
 
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        # the rows and the nested serializers aren't timed one by one, the list is timed once
+        list_kwargs = {key: value for key in ('allow_empty', 'max_length', 'min_length')
+                       if (value := kwargs.pop(key, None)) is not None}
+        child = cls(*args, **kwargs)
+        list_kwargs.update({key: value for key, value in kwargs.items() if key in serializers.LIST_SERIALIZER_KWARGS})
+        return TimedListSerializer(*args, child=child, **list_kwargs)
+
+    @property
+    def data(self):
+        # without a request measured by RequestTimingMiddleware nothing wraps the serialization
+        if current_metrics.get() is None:
+            return super().data
+        with serializer_timer():
+            return super().data
+
 
 class SignupSerializer(serializers.ModelSerializer):
     """ a serializer that is used for signup """
@@ -51,14 +97,14 @@ class SignupSerializer(serializers.ModelSerializer):
         return attrs
 
     def create(self, validated_data):
-        user = Users.objects.create(
+        # the async signup view hashes the password itself and passes the hash to save()
+        password_hash = validated_data.get('password_hash') or hash_password(validated_data['password'])
+        return Users.objects.create(
             email=validated_data['email'],
             first_name=validated_data['first_name'],
-            last_name=validated_data['last_name']
+            last_name=validated_data['last_name'],
+            password=password_hash
         )
-        user.set_password(validated_data['password'])
-        user.save()
-        return user
 
 
 class UserModelSerializer(DynamicFieldsModelSerializer):
@@ -157,12 +203,14 @@ class IssuesListSerializer(DynamicFieldsModelSerializer):
     priority_long = serializers.CharField(source='get_priority_display', read_only=True)
     status_long = serializers.CharField(source='get_status_display', read_only=True)
 
+    selectable_codes = ('tag', 'priority', 'status')
+
     class Meta:
         model = Issues
         fields = ['id', 'title', 'description', 'tag', 'tag_long', 'priority', 'priority_long',
                   'issue_project_id', 'status', 'status_long', 'issue_author_user_id',
                   'issue_author_user', 'issue_assignee_user_id', 'issue_assignee_user',
-                  'created_time']
+                  'created_time', 'comment_count']
         read_only_fields = ('issue_author_user_id', 'created_time', 'issue_project_id',
                             'issue_assignee_user_id', 'tag_long', 'priority_long', 'status display')
         extra_kwargs = {
@@ -186,21 +234,41 @@ class IssuesListSerializer(DynamicFieldsModelSerializer):
         return serializer.data
 
 
+def recent_comments_prefetch():
+
+    """ Prefetch of the API_EMBEDDED_COMMENTS most recent comments of the issues, with their authors, as
+    recent_comments (newest first), read by IssuesDetailSerializer """
+
+    return Prefetch(
+        'comments_issue_id',
+        queryset=Comments.objects.select_related('comments_author_user_id').order_by(
+            '-created_time', '-id')[:settings.API_EMBEDDED_COMMENTS],
+        to_attr='recent_comments'
+    )
+
+
 class IssuesDetailSerializer(DynamicFieldsModelSerializer):
-    """ Serializer used to display a detailed issue"""
+    """ Serializer used to display a detailed issue, with its most recent comments.
+    comments_issue_count is the number of comments of the issue, comments_issue_previous the link to the
+    page of the comments route which precedes the embedded ones """
 
     comments_issue = serializers.SerializerMethodField()
+    comments_issue_count = serializers.IntegerField(source='comment_count', read_only=True)
+    comments_issue_previous = serializers.SerializerMethodField()
     issue_author_user = serializers.SerializerMethodField()
     issue_assignee_user = serializers.SerializerMethodField()
     tag_long = serializers.CharField(source='get_tag_display', read_only=True)
     priority_long = serializers.CharField(source='get_priority_display', read_only=True)
     status_long = serializers.CharField(source='get_status_display', read_only=True)
 
+    selectable_codes = ('tag', 'priority', 'status')
+
     class Meta:
         model = Issues
         fields = ['id', 'title', 'description', 'tag', 'tag_long', 'priority', 'priority_long', 'issue_project_id',
                   'status', 'status_long', 'issue_author_user_id', 'issue_assignee_user_id', 'issue_assignee_user',
-                  'created_time', 'comments_issue_id', 'issue_author_user', 'comments_issue']
+                  'created_time', 'comments_issue_id', 'issue_author_user', 'comments_issue', 'comments_issue_count',
+                  'comments_issue_previous']
         read_only_fields = ('issue_author_user', 'created_time', 'issue_project_id', 'issue_assignee_user', 'tag_long',
                             'priority_long', 'status_long')
         extra_kwargs = {
@@ -213,12 +281,31 @@ class IssuesDetailSerializer(DynamicFieldsModelSerializer):
         }
 
     @staticmethod
-    def get_comments_issue(instance):
-        queryset = instance.comments_issue_id
-        serializer = CommentsListSerializer(queryset, many=True, fields=('id', 'description', 'comments_author_user_id',
-                                                                         'created_time'))
+    def recent_comments(instance):
+        if not hasattr(instance, 'recent_comments'):
+            instance.recent_comments = list(
+                instance.comments_issue_id.select_related('comments_author_user_id').order_by(
+                    '-created_time', '-id')[:settings.API_EMBEDDED_COMMENTS]
+            )
+        return instance.recent_comments
+
+    def get_comments_issue(self, instance):
+        serializer = CommentsListSerializer(reversed(self.recent_comments(instance)), many=True,
+                                            fields=('id', 'description', 'comments_author_user_id', 'created_time'))
         return serializer.data
 
+    def get_comments_issue_previous(self, instance):
+        comments = self.recent_comments(instance)
+        request = self.context.get('request')
+        if request is None or len(comments) >= instance.comment_count or not comments:
+            return None
+        paginator = CreatedTimeCursorPagination()
+        paginator.base_url = request.build_absolute_uri(reverse('comments-list', kwargs={
+            'project_pk': instance.issue_project_id_id, 'issues_pk': instance.pk
+        }))
+        position = paginator._get_position_from_instance(comments[-1], paginator.ordering)
+        return paginator.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
     @staticmethod
     def get_issue_author_user(instance):
         queryset = instance.issue_author_user_id
@@ -246,7 +333,11 @@ class ProjectsListSerializer(DynamicFieldsModelSerializer):
                   'project_type_long',
                   'project_author_user_id',
                   'project_author_user',
-                  'description'
+                  'description',
+                  'issue_count',
+                  'open_issue_count',
+                  'comment_count',
+                  'contributor_count'
                   ]
         read_only_fields = ('project_author_user', 'project_author_user_id', 'project_type_long')
         extra_kwargs = {
@@ -0,0 +1,240 @@
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from API.authentication import forget_user
+from API.events import event_broker, model_event
+from API.models import Users, Projects, Contributors, Issues, Comments, Deletions
+from API.search import search_backend
+
+
+def comment_project_id(comment):
+
+    """ Return the project id of a comment without loading the issue when it is already known """
+
+    if Comments.comments_issue_id.is_cached(comment):
+        return comment.comments_issue_id.issue_project_id_id
+    return Issues.objects.filter(pk=comment.comments_issue_id_id).values_list('issue_project_id', flat=True).first()
+
+
+def project_id_of(instance):
+
+    """ Return the id of the project a Projects / Contributors / Issues / Comments instance belongs to """
+
+    if isinstance(instance, Projects):
+        return instance.pk
+    if isinstance(instance, Contributors):
+        return instance.contributors_project_id_id
+    if isinstance(instance, Issues):
+        return instance.issue_project_id_id
+    return comment_project_id(instance)
+
+
+def project_changed(project_id, **counters):
+
+    """ Called after any write in a project, also by the bulk writes which don't send signals.
+    counters are the increments of the counters of the project, applied by the same UPDATE as the version """
+
+    increments = {field: F(field) + delta for field, delta in counters.items() if delta}
+    # the version bump also invalidates the cached responses of the project, see API.cache
+    Projects.objects.filter(pk=project_id).update(version=F('version') + 1, **increments)
+
+
+def counter_changes(instance, created=False, deleted=False):
+
+    """ Return the increments of the project counters caused by the creation, update or deletion of instance """
+
+    step = 1 if created else -1 if deleted else 0
+    if isinstance(instance, Contributors):
+        return {'contributor_count': step}
+    if isinstance(instance, Comments):
+        return {'comment_count': step}
+    if not isinstance(instance, Issues):
+        return {}
+    # an update opens or closes the issue when its status changes from / to TERMINE
+    was_open = getattr(instance, 'loaded_status', None) != Issues.TERMINE
+    instance.loaded_status = instance.status
+    if step:
+        return {'issue_count': step, 'open_issue_count': step if instance.is_open else 0}
+    return {'open_issue_count': int(instance.is_open) - int(was_open)}
+
+
+def deleted_parents(origin):
+
+    """ Set of the ('projects' / 'issues', id) deleted with origin, the instance or queryset delete() was called on.
+    The pre_delete receivers of a project or an issue do the work of the rows deleted with it in bulk, the
+    post_delete receivers of these rows skip it """
+
+    if origin is None:
+        return set()
+    parents = getattr(origin, 'deleted_parents', None)
+    if parents is None:
+        parents = origin.deleted_parents = set()
+    return parents
+
+
+def deleted_with_parent(instance, origin):
+
+    """ True if the contributor or comment instance is deleted with its project or its issue """
+
+    parents = deleted_parents(origin)
+    if isinstance(instance, Contributors):
+        return ('projects', instance.contributors_project_id_id) in parents
+    if isinstance(instance, Comments):
+        return ('issues', instance.comments_issue_id_id) in parents
+    return False
+
+
+def deleted_with_project(origin):
+    # the pre_delete of the issues is sent before the one of their project, which isn't marked yet
+    return isinstance(origin, Projects) or isinstance(origin, QuerySet) and origin.model is Projects
+
+
+def cascaded_comment_ids(issue):
+
+    """ Ids of the comments deleted with issue, read once for all the pre_delete receivers of the issue """
+
+    if not hasattr(issue, 'cascaded_comment_ids'):
+        issue.cascaded_comment_ids = list(
+            Comments.objects.filter(comments_issue_id=issue.pk).values_list('pk', flat=True)
+        )
+    return issue.cascaded_comment_ids
+
+
+@receiver(pre_delete, sender=Projects)
+@receiver(pre_delete, sender=Issues)
+def mark_deleted_parent(sender, instance, origin=None, **kwargs):
+    deleted_parents(origin).add((sender._meta.model_name, instance.pk))
+
+
+@receiver(post_save, sender=Projects)
+@receiver(post_save, sender=Contributors)
+@receiver(post_save, sender=Issues)
+@receiver(post_save, sender=Comments)
+@receiver(post_delete, sender=Contributors)
+@receiver(post_delete, sender=Comments)
+def invalidate_project_responses(sender, instance, created=False, origin=None, **kwargs):
+    deleted = kwargs['signal'] is post_delete
+    if deleted and deleted_with_parent(instance, origin):
+        return
+    project_changed(project_id_of(instance), **counter_changes(instance, created, deleted))
+
+
+@receiver(pre_delete, sender=Issues)
+def invalidate_deleted_issue(sender, instance, origin=None, **kwargs):
+    # one version bump for the issue and its comments, nothing to count in a deleted project
+    if not deleted_with_project(origin):
+        project_changed(instance.issue_project_id_id, comment_count=-len(cascaded_comment_ids(instance)),
+                        **counter_changes(instance, deleted=True))
+
+
+@receiver(post_save, sender=Comments)
+@receiver(post_delete, sender=Comments)
+def count_issue_comments(sender, instance, created=False, origin=None, **kwargs):
+    # the counter of an issue being deleted goes with it, the project counter is updated by its pre_delete
+    if created or kwargs['signal'] is post_delete and not deleted_with_parent(instance, origin):
+        # the issue is synced again with its new counter (see API.changes)
+        Issues.objects.filter(pk=instance.comments_issue_id_id).update(
+            comment_count=F('comment_count') + (1 if created else -1), updated_time=timezone.now())
+
+
+@receiver(post_delete, sender=Contributors)
+@receiver(post_delete, sender=Comments)
+def record_deletion(sender, instance, origin=None, **kwargs):
+    # tombstone read by the delta sync (see API.changes)
+    if not deleted_with_parent(instance, origin):
+        Deletions.objects.create(deleted_project_id=project_id_of(instance), model=sender._meta.model_name,
+                                 object_id=instance.pk)
+
+
+@receiver(pre_delete, sender=Issues)
+def record_issue_deletion(sender, instance, origin=None, **kwargs):
+    # the tombstones of the issue and its comments in one INSERT, those of a deleted project are forgotten
+    if not deleted_with_project(origin):
+        project_id = instance.issue_project_id_id
+        Deletions.objects.bulk_create(
+            [Deletions(deleted_project_id=project_id, model='issues', object_id=instance.pk)] +
+            [Deletions(deleted_project_id=project_id, model='comments', object_id=comment_id)
+             for comment_id in cascaded_comment_ids(instance)]
+        )
+
+
+@receiver(post_delete, sender=Projects)
+def forget_deletions(sender, instance, **kwargs):
+    # sent after the deletion of the contributors, issues and comments of the project
+    Deletions.objects.filter(deleted_project_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Issues)
+@receiver(post_save, sender=Comments)
+@receiver(post_delete, sender=Comments)
+def publish_event(sender, instance, created=False, origin=None, **kwargs):
+    if event_broker is None or kwargs['signal'] is post_delete and deleted_with_parent(instance, origin):
+        return
+    project_id = project_id_of(instance)
+    if not event_broker.wanted(project_id):
+        return
+    event = model_event(instance, 'deleted' if kwargs['signal'] is post_delete else 'created' if created else 'updated')
+    transaction.on_commit(lambda: event_broker.publish(project_id, event))
+
+
+@receiver(pre_delete, sender=Projects)
+def publish_project_deletion(sender, instance, **kwargs):
+    # ends the streams of the project, the events of its issues and comments aren't sent
+    project_id = instance.pk
+    if event_broker is None or not event_broker.wanted(project_id):
+        return
+    event = model_event(instance, 'deleted')
+    transaction.on_commit(lambda: event_broker.publish(project_id, event))
+
+
+@receiver(pre_delete, sender=Issues)
+def publish_issue_deletion(sender, instance, origin=None, **kwargs):
+    # the events of the comments deleted with the issue follow the one of the issue, a deleted project has none
+    project_id = instance.issue_project_id_id
+    if event_broker is None or deleted_with_project(origin) or not event_broker.wanted(project_id):
+        return
+    events = [model_event(instance, 'deleted')] + [
+        model_event(Comments(pk=comment_id, comments_issue_id_id=instance.pk), 'deleted')
+        for comment_id in cascaded_comment_ids(instance)
+    ]
+    for event in events:
+        transaction.on_commit(lambda event=event: event_broker.publish(project_id, event))
+
+
+@receiver(post_save, sender=Issues)
+def index_issue(sender, instance, **kwargs):
+    if search_backend is not None:
+        search_backend.index_issues([instance])
+
+
+@receiver(post_save, sender=Comments)
+def index_comment(sender, instance, **kwargs):
+    if search_backend is not None:
+        search_backend.index_comments([instance])
+
+
+@receiver(pre_delete, sender=Projects)
+def unindex_project(sender, instance, **kwargs):
+    if search_backend is not None:
+        search_backend.remove_project(instance.pk)
+
+
+@receiver(pre_delete, sender=Issues)
+def unindex_issue(sender, instance, origin=None, **kwargs):
+    if search_backend is not None and not deleted_with_project(origin):
+        search_backend.remove_issue(instance.pk)
+
+
+@receiver(post_delete, sender=Comments)
+def unindex_comment(sender, instance, origin=None, **kwargs):
+    if search_backend is not None and not deleted_with_parent(instance, origin):
+        search_backend.remove('comment', instance.pk)
+
+
+@receiver(post_save, sender=Users)
+@receiver(post_delete, sender=Users)
+def forget_cached_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
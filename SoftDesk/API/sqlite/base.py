@@ -0,0 +1,152 @@
+""" SQLite backend of the production database profile (SQLITE_PRODUCTION_DATABASE in the settings).
+On top of the backend of Django :
+- the PRAGMAs of OPTIONS['pragmas'] are applied to every new connection ;
+- a transaction starts with BEGIN IMMEDIATE and so takes the write lock of the database first. A deferred
+  transaction which reads then writes can't wait for the lock, SQLite answers "database is locked" at once
+  to avoid a deadlock, an immediate one waits for it with the busy timeout (OPTIONS['timeout']) ;
+- the transactions of the process wait for their turn on a lock by database file, for at most
+  OPTIONS['write_lock_timeout'] seconds, instead of polling the busy handler of SQLite together ;
+- a BEGIN IMMEDIATE still refused is tried again OPTIONS['begin_retries'] times : nothing was done yet ;
+- a write outside of a transaction (a save() in autocommit) waits for the same lock during its statement, so
+  the writers of the process are serialized whether they open an atomic() block or not ;
+- an atomic() block is a writer, it takes the lock even if it only reads. A block opened by read_only_atomic()
+  starts with a deferred BEGIN and doesn't wait for the writers : it must not write. """
+
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.backends.sqlite3 import base
+from django.db.utils import OperationalError
+
+# pragmas, write_lock_timeout and begin_retries are read by the wrapper, not by sqlite3.connect()
+WRAPPER_OPTIONS = ('pragmas', 'write_lock_timeout', 'begin_retries')
+RETRY_DELAY = 0.05
+# statements a connection in autocommit runs while holding the write lock of the process
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP', 'ALTER')
+
+write_locks = {}
+write_locks_lock = threading.Lock()
+
+
+def write_lock(name):
+
+    """ Lock of the writers of the process on the database file name """
+
+    with write_locks_lock:
+        return write_locks.setdefault(str(name), threading.Lock())
+
+
+@contextmanager
+def read_only_atomic(using=None):
+
+    """ atomic() block which only reads, without taking the write lock of the database """
+
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    previous, connection.read_only_block = getattr(connection, 'read_only_block', False), True
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        connection.read_only_block = previous
+
+
+class SerializedCursorWrapper(base.SQLiteCursorWrapper):
+
+    """ Cursor taking the write lock of the process around the writes made in autocommit """
+
+    database = None
+
+    def execute(self, query, params=None):
+        with self.database.autocommit_write(query):
+            return super().execute(query, params)
+
+    def executemany(self, query, param_list):
+        with self.database.autocommit_write(query):
+            return super().executemany(query, param_list)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    held_write_lock = None
+    read_only_block = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for option in WRAPPER_OPTIONS:
+            params.pop(option, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict['OPTIONS'].get('pragmas', {}).items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SerializedCursorWrapper)
+        cursor.database = self
+        return cursor
+
+    def acquire_write_lock(self):
+        options = self.settings_dict['OPTIONS']
+        lock = write_lock(self.settings_dict['NAME'])
+        if not lock.acquire(timeout=options.get('write_lock_timeout', options.get('timeout', 5))):
+            raise OperationalError("database is locked : the other writers of the process held it too long")
+        self.held_write_lock = lock
+
+    @contextmanager
+    def autocommit_write(self, query):
+        # in a transaction the lock is held since its BEGIN IMMEDIATE, or not needed in a read-only block
+        if self.held_write_lock is not None or not self.get_autocommit() or \
+                not query.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            yield
+            return
+        self.acquire_write_lock()
+        try:
+            yield
+        finally:
+            self.release_write_lock()
+
+    def _start_transaction_under_autocommit(self):
+        if self.read_only_block:
+            return super()._start_transaction_under_autocommit()
+        options = self.settings_dict['OPTIONS']
+        self.acquire_write_lock()
+        try:
+            retries = options.get('begin_retries', 3)
+            for attempt in range(retries + 1):
+                try:
+                    self.cursor().execute('BEGIN IMMEDIATE')
+                    return
+                except OperationalError as error:
+                    if 'locked' not in str(error) or attempt == retries:
+                        raise
+                    time.sleep(RETRY_DELAY * 2 ** attempt)
+        except BaseException:
+            self.release_write_lock()
+            raise
+
+    def release_write_lock(self):
+        lock, self.held_write_lock = self.held_write_lock, None
+        if lock is not None:
+            lock.release()
+
+    def _commit(self):
+        try:
+            super()._commit()
+        finally:
+            self.release_write_lock()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self.release_write_lock()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self.release_write_lock()
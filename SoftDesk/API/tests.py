@@ -1,3 +1,1602 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import re
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.core.checks import run_checks
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, OperationalError, connection, connections, transaction
+from django.db.models import F
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+from rest_framework.test import APIClient, APIRequestFactory
+
+from API.async_views import event_stream
+from API.authentication import user_cache
+from API.benchmarks import ENDPOINTS, access_token, authenticated_client, benchmark_endpoints, concurrent_writes, \
+    seed_dataset, signup_payload, temporary_database
+from API.cache import build_response_cache, response_cache
+from API.changes import changed, encode_since, project_comments
+from API.counters import find_drift, recount
+from API.events import RESYNC, EventBroker, LocalPubSubClient, RedisFanout, event_broker
+from API.exports import export_lines, project_records
+from API.fast_serializers import FastIssuesListSerializer
+from API.middleware import DisconnectWatcher, serializer_timer
+from API.models import Users, Projects, Contributors, Issues, Comments, Deletions
+from API.permissions import get_project_membership, is_project_member, is_project_owner
+from API.serializers import IssuesListSerializer
+from API.sqlite.base import read_only_atomic, write_lock
+from API.stats import grouped_issues
+from API.tokens import BloomFilter, FrontedRefreshToken, blacklist_front
+
+
+def seed_project(author, contributors=5, issues=20, comments=3):
+
+    """ Create a project owned by author with contributors, issues and comments """
+
+    project = Projects.objects.create(title='Projet', description='Description', project_type='B',
+                                      project_author_user_id=author)
+    Contributors.objects.create(contributors_user_id=author, contributors_project_id=project,
+                                permission=Contributors.COMPLETE, role=Contributors.AUTEUR)
+    users = Users.objects.bulk_create([
+        Users(email=f'{project.pk}-{index}@softdesk.fr', first_name='Prénom', last_name='Nom')
+        for index in range(contributors)
+    ])
+    Contributors.objects.bulk_create([
+        Contributors(contributors_user_id=user, contributors_project_id=project,
+                     permission=Contributors.LIMITEE, role=Contributors.CONTRIBUTEUR)
+        for user in users
+    ])
+    project_issues = Issues.objects.bulk_create([
+        Issues(title=f'Problème {index}', description='Description', tag='B', priority='F', status='A',
+               issue_project_id=project, issue_author_user_id=author, issue_assignee_user_id=author)
+        for index in range(issues)
+    ])
+    Comments.objects.bulk_create([
+        Comments(description='Commentaire', comments_author_user_id=author, comments_issue_id=issue)
+        for issue in project_issues for _ in range(comments)
+    ])
+    recount([project.pk])
+    return project, project_issues
+
+
+class IndexUsageTests(TestCase):
+
+    """ Check with EXPLAIN QUERY PLAN that the list endpoints never scan a whole table """
+
+    FULL_SCAN = re.compile(r'^SCAN (API_\w+)(?! USING (COVERING )?INDEX)')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        other = Users.objects.create(email='autre@softdesk.fr', first_name='Prénom', last_name='Nom')
+        for _ in range(3):
+            seed_project(other)
+        cls.project, issues = seed_project(cls.user)
+        cls.issue = issues[0]
+
+    def setUp(self):
+        response_cache.backend.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def full_scans(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        scans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                for row in cursor.fetchall():
+                    match = self.FULL_SCAN.match(row[-1])
+                    if match:
+                        scans.append((match.group(1), query['sql']))
+        return scans
+
+    def test_projects_list_uses_index(self):
+        self.assertEqual(self.full_scans('/api/projects/'), [])
+
+    def test_contributors_list_uses_index(self):
+        self.assertEqual(self.full_scans(f'/api/projects/{self.project.pk}/users/'), [])
+
+    def test_issues_list_uses_index(self):
+        self.assertEqual(self.full_scans(f'/api/projects/{self.project.pk}/issues/'), [])
+
+    def test_comments_list_uses_index(self):
+        url = f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/'
+        self.assertEqual(self.full_scans(url), [])
+
+    def test_filtered_issues_list_uses_index(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        for query in ('?status=A,E', '?priority=E&ordering=-created_time', '?tag=B',
+                      '?created_after=2020-01-01', f'?author={self.user.pk}', f'?assignee={self.user.pk}&status=T'):
+            self.assertEqual(self.full_scans(url + query), [])
+        self.assertEqual(self.full_scans(url + '?ordering=-priority'), [])
+        plan = Issues.objects.filter(issue_project_id=self.project.pk, priority='E').order_by(
+            'created_time', 'id').explain()
+        self.assertIn('issue_project_priority_idx', plan)
+
+    def test_changes_use_index(self):
+        since = encode_since(self.issue.created_time)
+        self.assertEqual(self.full_scans(f'/api/projects/{self.project.pk}/changes/?since={since}'), [])
+        # the comments are read from the issues of the project, not from the changes of every project
+        plan = changed(project_comments(self.project.pk), 'updated_time', self.issue.created_time).explain()
+        self.assertIn('comment_issue_updated_idx', plan)
+        self.assertIn('issue_project', plan)
+
+    def test_stats_use_covering_index(self):
+        self.assertEqual(self.full_scans(f'/api/projects/{self.project.pk}/stats/'), [])
+        plan = grouped_issues(self.project.pk).explain()
+        self.assertIn('USING COVERING INDEX issue_project_stats_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class ProjectMembershipTests(TestCase):
+
+    """ The membership of the user is read once per request and project """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, issues = seed_project(cls.user, contributors=2, issues=2, comments=1)
+        cls.issue = issues[0]
+
+    def setUp(self):
+        response_cache.backend.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_memoized_on_the_request(self):
+        request = APIRequestFactory().get('/')
+        request.user = self.user
+        with self.assertNumQueries(1):
+            self.assertTrue(is_project_member(request, self.project.pk))
+            self.assertTrue(is_project_owner(request, self.project.pk))
+            self.assertEqual(get_project_membership(request, str(self.project.pk)).permission, Contributors.COMPLETE)
+
+    def test_one_membership_query_per_request(self):
+        for url in (f'/api/projects/{self.project.pk}/', f'/api/projects/{self.project.pk}/issues/',
+                    f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/'):
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            memberships = [
+                query for query in context.captured_queries
+                if query['sql'].startswith('SELECT "API_contributors"."id", "API_contributors"."permission"')
+            ]
+            self.assertEqual(len(memberships), 1, url)
+
+    def test_contributor_added_to_a_missing_project(self):
+        response = self.client.post('/api/projects/999999/users/', {'contributors_user_id': self.user.pk,
+                                                                    'role': 'CT'})
+        self.assertEqual(response.status_code, 403)
+
+
+class ReadQueryCountTests(TestCase):
+
+    """ The detail and list routes read a constant number of queries whatever the number of rows """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, issues = seed_project(cls.user, contributors=2, issues=2, comments=1)
+        cls.issue = issues[0]
+        cls.comment = Comments.objects.filter(comments_issue_id=cls.issue).first()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.urls = [
+            f'/api/projects/{self.project.pk}/',
+            f'/api/projects/{self.project.pk}/issues/',
+            f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/',
+            f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/',
+            f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/{self.comment.pk}/',
+        ]
+
+    def query_counts(self):
+        counts = []
+        for url in self.urls:
+            response_cache.backend.clear()
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.client.get(url).status_code, 200, url)
+            counts.append(len(context.captured_queries))
+        return counts
+
+    def test_counts_do_not_grow_with_rows(self):
+        before = self.query_counts()
+        # each new row has its own author, a lookup by row would add a query per author
+        authors = Users.objects.bulk_create([
+            Users(email=f'nouveau-{index}@softdesk.fr', first_name='Prénom', last_name='Nom') for index in range(5)
+        ])
+        Contributors.objects.bulk_create([
+            Contributors(contributors_user_id=author, contributors_project_id=self.project,
+                         permission=Contributors.LIMITEE, role=Contributors.CONTRIBUTEUR)
+            for author in authors
+        ])
+        Issues.objects.bulk_create([
+            Issues(title='Problème', description='Description', tag='B', priority='F', status='A',
+                   issue_project_id=self.project, issue_author_user_id=author, issue_assignee_user_id=author)
+            for author in authors
+        ])
+        Comments.objects.bulk_create([
+            Comments(description='Commentaire', comments_author_user_id=author, comments_issue_id=self.issue)
+            for author in authors
+        ])
+        self.assertEqual(self.query_counts(), before)
+
+
+class ProjectsListTests(TestCase):
+
+    """ The projects list only shows the projects the user contributes to """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        other = Users.objects.create(email='autre@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.other_project, _ = seed_project(other, issues=0)
+        cls.projects = [seed_project(cls.user, issues=0)[0] for _ in range(2)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_is_scoped_to_contributions(self):
+        response = self.client.get('/api/projects/')
+        self.assertEqual([project['id'] for project in response.data['results']],
+                         [project.pk for project in self.projects])
+
+    def test_list_filters_by_projects_id(self):
+        response = self.client.get('/api/projects/', {'projects_id': self.projects[1].pk})
+        self.assertEqual([project['id'] for project in response.data['results']], [self.projects[1].pk])
+        response = self.client.get('/api/projects/', {'projects_id': self.other_project.pk})
+        self.assertEqual(response.data['results'], [])
+
+    def test_list_query_count_does_not_depend_on_size(self):
+        with self.assertNumQueries(1):
+            self.client.get('/api/projects/')
+
+
+class CursorPaginationTests(TestCase):
+
+    """ The lists are paginated with a keyset cursor and a capped page size """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        # issues inserted together share their created_time, their id breaks the tie
+        cls.project, cls.issues = seed_project(cls.user, contributors=0, issues=settings.API_MAX_PAGE_SIZE + 5,
+                                               comments=0)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/projects/{self.project.pk}/issues/'
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(self.url, {'page_size': settings.API_MAX_PAGE_SIZE * 10})
+        self.assertEqual(len(response.data['results']), settings.API_MAX_PAGE_SIZE)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_stable_order_across_pages(self):
+        ids, url = [], f'{self.url}?page_size=7'
+        while url:
+            response = self.client.get(url)
+            ids += [issue['id'] for issue in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(ids, sorted(issue.pk for issue in self.issues))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'pas-un-curseur'})
+        self.assertEqual(response.status_code, 404)
+
+
+class ResponseCacheTests(TestCase):
+
+    """ Read responses are cached per project and dropped on writes """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, issues = seed_project(cls.user, issues=3)
+        cls.issue = issues[0]
+        cls.other_project, _ = seed_project(cls.user, issues=3)
+
+    def setUp(self):
+        response_cache.backend.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cached_reads_only_check_membership(self):
+        urls = [f'/api/projects/{self.project.pk}/',
+                f'/api/projects/{self.project.pk}/issues/',
+                f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/',
+                f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/']
+        for url in urls:
+            first = self.client.get(url)
+            with self.assertNumQueries(1):
+                second = self.client.get(url)
+            self.assertEqual(first.json(), second.json())
+
+    def test_write_invalidates_only_its_project(self):
+        comments_url = f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/'
+        other_url = f'/api/projects/{self.other_project.pk}/issues/'
+        self.assertEqual(len(self.client.get(comments_url).data['results']), 3)
+        self.client.get(other_url)
+        self.client.post(comments_url, {'description': 'Nouveau commentaire'})
+        self.assertEqual(len(self.client.get(comments_url).data['results']), 4)
+        with self.assertNumQueries(1):
+            self.client.get(other_url)
+
+    def test_write_of_another_worker_invalidates(self):
+        comments_url = f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/'
+        self.assertEqual(len(self.client.get(comments_url).data['results']), 3)
+        # a worker shares the database, not the in-process cache
+        Comments.objects.bulk_create([Comments(description='Commentaire', comments_author_user_id=self.user,
+                                               comments_issue_id=self.issue)])
+        Projects.objects.filter(pk=self.project.pk).update(version=F('version') + 1)
+        self.assertEqual(len(self.client.get(comments_url).data['results']), 4)
+
+    def test_non_member_is_not_served_from_cache(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        self.client.get(url)
+        outsider = Users.objects.create(email='outsider@softdesk.fr', first_name='Prénom', last_name='Nom')
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class RedisCacheBackendTests(TestCase):
+
+    """ The Redis backend built from API_RESPONSE_CACHE, with the in-process stand-in client """
+
+    def build(self, **options):
+        config = {'BACKEND': 'API.cache.RedisCacheBackend',
+                  'OPTIONS': {'client_class': 'API.cache.LocalRedisClient', 'prefix': 'test-cache', **options}}
+        with override_settings(API_RESPONSE_CACHE=config):
+            return build_response_cache().backend
+
+    def setUp(self):
+        self.backend = self.build()
+        self.backend.clear()
+
+    def test_get_set_delete(self):
+        self.assertIsNone(self.backend.get('clé'))
+        self.backend.set('clé', {'results': [1, 2]})
+        # the clients share the keys like the workers sharing one Redis
+        self.assertEqual(self.build().get('clé'), {'results': [1, 2]})
+        self.backend.delete('clé')
+        self.assertIsNone(self.backend.get('clé'))
+
+    def test_timeout(self):
+        backend = self.build(timeout=10)
+        backend.set('clé', 1)
+        now = time.monotonic()
+        with mock.patch('API.cache.time.monotonic', return_value=now + 11):
+            self.assertIsNone(backend.get('clé'))
+
+    def test_eviction(self):
+        backend = self.build(client_options={'max_entries': 2})
+        for key in ('a', 'b'):
+            backend.set(key, key)
+        backend.get('a')
+        backend.set('c', 'c')
+        self.assertEqual([backend.get(key) for key in ('a', 'b', 'c')], ['a', None, 'c'])
+
+    def test_clear_only_the_prefix(self):
+        other = self.build(prefix='autre-application')
+        other.set('clé', 1)
+        for index in range(600):
+            self.backend.set(index, index)
+        self.backend.clear()
+        self.assertEqual([key for key in self.backend.client.scan_iter(match='test-cache:*')], [])
+        self.assertEqual(other.get('clé'), 1)
+        other.clear()
+
+
+class BulkIssuesTests(TestCase):
+
+    """ The bulk route writes every issue in one transaction or nothing """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, cls.issues = seed_project(cls.user, issues=3)
+        cls.url = f'/api/projects/{cls.project.pk}/issues/bulk/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_update_and_close(self):
+        creates = [{'title': f'Nouveau {index}', 'description': 'Description', 'tag': 'T', 'priority': 'E',
+                    'status': 'A'} for index in range(50)]
+        response = self.client.post(self.url, {
+            'create': creates,
+            'update': [{'id': self.issues[0].pk, 'priority': 'E'}],
+            'close': [self.issues[1].pk]
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['created']), 50)
+        self.assertEqual(Issues.objects.filter(issue_project_id=self.project).count(), 53)
+        self.issues[0].refresh_from_db()
+        self.issues[1].refresh_from_db()
+        self.assertEqual((self.issues[0].priority, self.issues[1].status), ('E', 'T'))
+
+    def test_query_count_does_not_depend_on_size(self):
+        creates = [{'title': 'Nouveau', 'description': 'Description', 'tag': 'T', 'priority': 'E',
+                    'status': 'A'} for _ in range(90)]
+        updates = [{'id': issue.pk, 'status': 'E'} for issue in self.issues]
+        # membership, issues to update, project, savepoint, insert (one up to SQLite's 999 parameters), update,
+        # search index (delete + insert), project version and counters, release
+        with self.assertNumQueries(10):
+            self.client.post(self.url, {'create': creates, 'update': updates}, format='json')
+
+    def test_invalid_item_rolls_back_everything(self):
+        response = self.client.post(self.url, {
+            'create': [{'title': 'Valide', 'description': 'Description', 'tag': 'T', 'priority': 'E', 'status': 'A'},
+                       {'title': 'Invalide', 'description': 'Description', 'tag': 'X', 'priority': 'E',
+                        'status': 'A'}],
+            'update': [{'id': 0, 'status': 'T'}]
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['create'][0], {})
+        self.assertIn('tag', response.data['create'][1])
+        self.assertIn('id', response.data['update'][0])
+        self.assertEqual(Issues.objects.filter(issue_project_id=self.project).count(), 3)
+
+    def test_version_committed_with_the_issues(self):
+        creates = [{'title': 'Nouveau', 'description': 'Description', 'tag': 'T', 'priority': 'E', 'status': 'A'}]
+        with mock.patch('API.views.project_changed', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client.post(self.url, {'create': creates}, format='json')
+        self.assertEqual(Issues.objects.filter(issue_project_id=self.project).count(), 3)
+        with mock.patch('API.views.publish_instances') as publish_instances:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.client.post(self.url, {'create': creates}, format='json')
+            publish_instances.assert_not_called()
+            for callback in callbacks:
+                callback()
+            self.assertEqual(publish_instances.call_count, 2)
+
+    def test_invalid_body(self):
+        response = self.client.post(self.url, [{'create': []}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('non_field_errors', response.data)
+        response = self.client.post(self.url, {'create': [{}, 'problème'], 'update': 5}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['create'][0], {})
+        self.assertIn('non_field_errors', response.data['create'][1])
+        self.assertIn('non_field_errors', response.data['update'])
+        response = self.client.post(self.url, {'update': {'a': 1}}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('non_field_errors', response.data['update'])
+        self.assertEqual(Issues.objects.filter(issue_project_id=self.project).count(), 3)
+
+
+class ProjectExportTests(TestCase):
+
+    """ The export streams every issue followed by its comments """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, cls.issues = seed_project(cls.user, issues=4, comments=2)
+        seed_project(cls.user, issues=2, comments=2)
+        cls.url = f'/api/projects/{cls.project.pk}/export/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_ndjson_export(self):
+        response = self.client.get(self.url)
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([record['type'] for record in records], ['issue', 'comment', 'comment'] * 4)
+        self.assertEqual([record['id'] for record in records if record['type'] == 'issue'],
+                         [issue.pk for issue in self.issues])
+
+    def test_csv_export(self):
+        response = self.client.get(self.url, {'export_format': 'csv'})
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows[1]['comments_issue_id'], str(self.issues[0].pk))
+
+    def test_export_requires_membership(self):
+        self.client.force_authenticate(Users.objects.create(email='outsider@softdesk.fr'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+@override_settings(ROOT_URLCONF='SoftDesk.asgi_urls', API_EXPORT_CHUNK_SIZE=3)
+class AsyncProjectExportTests(TestCase):
+
+    """ The ASGI application streams the export from an async iterator, the same lines as the sync one """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, cls.issues = seed_project(cls.user, issues=4, comments=2)
+        cls.url = f'/api/projects/{cls.project.pk}/export/'
+
+    async def read(self, response):
+        return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+    async def test_export(self):
+        client = AsyncClient()
+        headers = {'Authorization': f'Bearer {access_token(self.user)}'}
+        for export_format in ('ndjson', 'csv'):
+            response = await client.get(self.url, {'export_format': export_format}, headers=headers)
+            self.assertTrue(response.is_async)
+            expected = await sync_to_async(lambda: ''.join(
+                export_lines(export_format, project_records(self.project.pk, chunk_size=3))
+            ))()
+            self.assertEqual(await self.read(response), expected)
+        self.assertEqual((await client.get(self.url, {'export_format': 'xml'}, headers=headers)).status_code, 400)
+        outsider = await Users.objects.acreate(email='outsider@softdesk.fr')
+        response = await client.get(self.url, headers={'Authorization': f'Bearer {access_token(outsider)}'})
+        self.assertEqual(response.status_code, 403)
+
+
+class BenchmarkTests(TestCase):
+
+    """ The benchmark suite reaches every endpoint on a small dataset """
+
+    def test_every_endpoint_is_measured(self):
+        user, ids = seed_dataset(projects=2, contributors=3, issues=4, comments=2)
+        results = benchmark_endpoints(authenticated_client(user), ids, repeat=1)
+        self.assertEqual(set(results), set(ENDPOINTS))
+        for result in results.values():
+            self.assertEqual(result['status'], 200)
+            self.assertGreater(result['bytes'], 0)
+
+
+@override_settings(API_REQUEST_TIMING=True)
+class RequestTimingTests(TestCase):
+
+    """ The timing middleware reports the measures of the request """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, _ = seed_project(cls.user, issues=3)
+
+    def setUp(self):
+        response_cache.backend.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_and_log(self):
+        with self.assertLogs('API.timing', level='INFO') as logs:
+            response = self.client.get(f'/api/projects/{self.project.pk}/issues/')
+        self.assertRegex(response['Server-Timing'],
+                         r'^db;dur=[\d.]+;desc="2 queries", db-slowest;dur=[\d.]+, serializer;dur=[\d.]+, '
+                         r'total;dur=[\d.]+$')
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['route'], line['status'], line['queries']), ('issues', 200, 2))
+        self.assertGreater(line['serializer_ms'], 0)
+
+    @override_settings(API_REQUEST_TIMING=False)
+    def test_serializers_not_wrapped_when_disabled(self):
+        with mock.patch('API.serializers.serializer_timer', wraps=serializer_timer) as timer:
+            self.client.get(f'/api/projects/{self.project.pk}/issues/')
+            self.client.get(f'/api/projects/{self.project.pk}/')
+        timer.assert_not_called()
+
+    @override_settings(API_REQUEST_TIMING=False)
+    def test_disabled(self):
+        response = self.client.get(f'/api/projects/{self.project.pk}/issues/')
+        self.assertNotIn('Server-Timing', response)
+
+
+class SearchTests(TestCase):
+
+    """ The search only returns issues and comments of the user's projects, best matches first """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, _ = seed_project(cls.user, issues=0)
+        other_project, _ = seed_project(Users.objects.create(email='autre@softdesk.fr'), issues=0)
+        cls.issue = Issues.objects.create(title='Connexion impossible', description='Le serveur répond 500',
+                                          tag='B', priority='E', status='A', issue_project_id=cls.project,
+                                          issue_author_user_id=cls.user, issue_assignee_user_id=cls.user)
+        cls.comment = Comments.objects.create(description='La connexion échoue aussi sur mobile',
+                                              comments_author_user_id=cls.user, comments_issue_id=cls.issue)
+        Issues.objects.create(title='Connexion lente', description='Privé', tag='B', priority='E', status='A',
+                              issue_project_id=other_project, issue_author_user_id=cls.user,
+                              issue_assignee_user_id=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params):
+        return self.client.get('/api/search/', params).data
+
+    def test_results_are_ranked_and_scoped(self):
+        results = self.search(q='connexion')['results']
+        self.assertEqual([(result['type'], result['id']) for result in results],
+                         [('issue', self.issue.pk), ('comment', self.comment.pk)])
+        self.assertIn('<mark>', results[1]['snippet'])
+
+    def test_accents_and_prefixes(self):
+        results = self.search(q='echou mobile')['results']
+        self.assertEqual([result['id'] for result in results], [self.comment.pk])
+
+    def test_cursor_pagination(self):
+        first = self.search(q='connexion', page_size=1)
+        second = self.client.get(first['next']).data
+        self.assertEqual(first['results'][0]['type'], 'issue')
+        self.assertEqual(second['results'][0]['type'], 'comment')
+        self.assertIsNone(second['next'])
+
+    def test_snippets_are_escaped(self):
+        Comments.objects.create(description='<img src=x onerror=alert(1)> Déconnexion',
+                                comments_author_user_id=self.user, comments_issue_id=self.issue)
+        snippet = self.search(q='deconnexion')['results'][0]['snippet']
+        self.assertEqual(snippet, '&lt;img src=x onerror=alert(1)&gt; <mark>Déconnexion</mark>')
+
+    def test_page_size_and_invalid_cursor(self):
+        first = self.search(q='connexion', page_size=0)
+        self.assertEqual(len(first['results']), 1)
+        self.assertIn('page_size=1', first['next'])
+        response = self.client.get('/api/search/', {'q': 'connexion', 'cursor': 'pas-un-curseur'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_index_follows_writes(self):
+        self.comment.description = 'Réglé'
+        self.comment.save()
+        self.assertEqual(len(self.search(q='mobile')['results']), 0)
+        self.issue.delete()
+        self.assertEqual(self.search(q='connexion')['results'], [])
+
+    def test_cascades_unindexed_in_one_statement(self):
+        with CaptureQueriesContext(connection) as context:
+            self.issue.delete()
+        self.assertEqual(len([query for query in context.captured_queries
+                              if query['sql'].startswith('DELETE FROM API_search_index')]), 1)
+        self.assertEqual(self.search(q='connexion')['results'], [])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM API_search_index')
+            self.assertEqual(cursor.fetchone()[0], 1)
+        Projects.objects.exclude(pk=self.project.pk).delete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM API_search_index')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM API_search_index')
+        call_command('rebuild_search_index', stdout=open(os.devnull, 'w'))
+        self.assertEqual(len(self.search(q='connexion')['results']), 2)
+
+    def test_backend_must_match_the_database(self):
+        self.assertEqual([error for error in run_checks() if error.id == 'API.E001'], [])
+        # the FTS5 table of SQLiteFTSBackend isn't created on the other databases
+        with mock.patch.object(connections['default'], 'vendor', 'postgresql'):
+            errors = [error for error in run_checks() if error.id == 'API.E001']
+        self.assertEqual(len(errors), 1)
+        self.assertIn('postgresql', errors[0].msg)
+
+
+class ConditionalGetTests(TestCase):
+
+    """ Project routes return an ETag from the project version and answer If-None-Match with a 304 """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, issues = seed_project(cls.user, issues=3)
+        cls.issue = issues[0]
+        cls.urls = [f'/api/projects/{cls.project.pk}/',
+                    f'/api/projects/{cls.project.pk}/users/',
+                    f'/api/projects/{cls.project.pk}/issues/',
+                    f'/api/projects/{cls.project.pk}/issues/{cls.issue.pk}/',
+                    f'/api/projects/{cls.project.pk}/issues/{cls.issue.pk}/comments/']
+
+    def setUp(self):
+        response_cache.backend.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_not_modified_after_one_query(self):
+        for url in self.urls:
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_writes_change_the_etag(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        etag = self.client.get(url)['ETag']
+        self.client.post(f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/',
+                         {'description': 'Nouveau commentaire'})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_project_update_keeps_the_version_increasing(self):
+        stale = Projects.objects.get(pk=self.project.pk)
+        Comments.objects.create(description='Commentaire', comments_author_user_id=self.user,
+                                comments_issue_id=self.issue)
+        version = Projects.objects.get(pk=self.project.pk).version
+        stale.title = 'Nouveau titre'
+        stale.save()
+        self.assertEqual(Projects.objects.get(pk=self.project.pk).version, version + 1)
+
+
+@override_settings(ROOT_URLCONF='SoftDesk.asgi_urls')
+class AsyncViewsTests(TestCase):
+
+    """ The async read views of the ASGI application answer like the viewsets """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.ids = seed_dataset(projects=2, contributors=3, issues=5, comments=3)
+        cls.outsider = Users.objects.create(email='outsider@softdesk.fr')
+
+    def setUp(self):
+        response_cache.backend.clear()
+        self.headers = {'Authorization': f'Bearer {access_token(self.user)}'}
+
+    async def test_same_json_as_the_viewsets(self):
+        client = AsyncClient()
+        for name in ('projects-list', 'projects-detail', 'issues-list', 'issues-detail', 'comments-list',
+                     'comments-detail'):
+            url = ENDPOINTS[name].format(**self.ids)
+            response = await client.get(url, headers=self.headers)
+            with override_settings(ROOT_URLCONF='SoftDesk.urls'):
+                expected = await client.get(url, headers=self.headers)
+            self.assertEqual(response.status_code, 200, name)
+            self.assertEqual(response.json(), expected.json(), name)
+
+    async def test_pagination(self):
+        client = AsyncClient()
+        url = ENDPOINTS['issues-list'].format(**self.ids)
+        first = (await client.get(url, {'page_size': 3}, headers=self.headers)).json()
+        second = (await client.get(first['next'], headers=self.headers)).json()
+        self.assertEqual(len(first['results']) + len(second['results']), 5)
+        self.assertIsNone(second['next'])
+
+    async def test_authentication_membership_and_etag(self):
+        client = AsyncClient()
+        url = ENDPOINTS['issues-list'].format(**self.ids)
+        self.assertEqual((await client.get(url)).status_code, 401)
+        outsider = {'Authorization': f'Bearer {access_token(self.outsider)}'}
+        self.assertEqual((await client.get(url, headers=outsider)).status_code, 403)
+        etag = (await client.get(url, headers=self.headers))['ETag']
+        response = await client.get(url, headers={**self.headers, 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_writes_go_to_the_viewsets(self):
+        client = AsyncClient()
+        url = ENDPOINTS['comments-list'].format(**self.ids)
+        response = await client.post(url, {'description': 'Nouveau commentaire'}, headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+
+
+class FastListSerializationTests(TestCase):
+
+    """ The values() based list serialization returns the JSON of the model serializers, faster """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.ids = seed_dataset(projects=2, contributors=3, issues=300, comments=2)
+
+    def setUp(self):
+        response_cache.backend.clear()
+        self.client = authenticated_client(self.user)
+
+    def test_same_output(self):
+        for name in ('projects-list', 'issues-list', 'comments-list'):
+            url = ENDPOINTS[name].format(**self.ids)
+            with override_settings(API_FAST_LIST_SERIALIZATION=False):
+                expected = self.client.get(url, {'page_size': 100}).json()
+            response_cache.backend.clear()
+            with override_settings(API_FAST_LIST_SERIALIZATION=True):
+                response = self.client.get(url, {'page_size': 100}).json()
+            self.assertEqual(response, expected, name)
+
+    def test_faster(self):
+        queryset = Issues.objects.filter(issue_project_id=self.ids['project']).order_by('id')
+
+        def best_of(serialize):
+            timings = []
+            for _ in range(3):
+                start = time.perf_counter()
+                serialize()
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        model_time = best_of(lambda: IssuesListSerializer(
+            queryset.select_related('issue_author_user_id', 'issue_assignee_user_id'), many=True).data)
+        fast_serializer = FastIssuesListSerializer()
+        fast_time = best_of(lambda: fast_serializer.to_representation(queryset.values(*fast_serializer.columns)))
+        self.assertGreater(model_time / fast_time, 3)
+
+
+class UserCacheTests(TestCase):
+
+    """ The user of the token is read once, then from the user cache until it changes """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, _ = seed_project(cls.user, issues=3)
+
+    def setUp(self):
+        response_cache.backend.clear()
+        user_cache.clear()
+        self.client = authenticated_client(self.user)
+        self.url = f'/api/projects/{self.project.pk}/issues/'
+
+    def test_user_query_saved(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(self.url)
+        response_cache.backend.clear()
+        with CaptureQueriesContext(connection) as warm:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(cold.captured_queries) - len(warm.captured_queries), 1)
+
+    def test_deactivated_user_rejected(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_deleted_user_rejected(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        Users.objects.filter(pk=self.user.pk).delete()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class RefreshTokenBlacklistTests(TestCase):
+
+    """ A rotated refresh token is revoked, the check of a valid token doesn't query the blacklist """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.user.set_password('Mot2passe!')
+        cls.user.save()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.refresh = self.client.post('/api/login/', {'email': 'auteur@softdesk.fr', 'password': 'Mot2passe!'},
+                                        format='json').json()['refresh']
+
+    def refresh_token(self, token):
+        return self.client.post('/api/login/refresh/', {'refresh': token}, format='json')
+
+    def test_rotation_revokes_the_token(self):
+        response = self.refresh_token(self.refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh_token(self.refresh).status_code, 401)
+        self.assertEqual(self.refresh_token(response.json()['refresh']).status_code, 200)
+
+    def test_valid_token_checked_in_memory(self):
+        with CaptureQueriesContext(connection) as context:
+            self.refresh_token(self.refresh)
+        self.assertFalse([query for query in context.captured_queries
+                          if 'SELECT' in query['sql'] and 'token_blacklist_blacklistedtoken' in query['sql']
+                          and 'jti' in query['sql']])
+
+    def test_token_blacklisted_by_another_process(self):
+        token = FrontedRefreshToken(self.refresh)
+        outstanding = OutstandingToken.objects.get(jti=token['jti'])
+        BlacklistedToken.objects.create(token=outstanding)
+        blacklist_front.sync()
+        self.assertEqual(self.refresh_token(self.refresh).status_code, 401)
+
+    def test_purge_expired(self):
+        self.refresh_token(self.refresh)
+        OutstandingToken.objects.update(expires_at=aware_utcnow() - timedelta(seconds=1))
+        blacklist_front.purge()
+        self.assertFalse(OutstandingToken.objects.exists())
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for index in range(1000):
+            bloom.add(f'present-{index}')
+        self.assertTrue(all(f'present-{index}' in bloom for index in range(1000)))
+        false_positives = sum(f'absent-{index}' in bloom for index in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+@override_settings(API_PASSWORD_HASHING={'ITERATIONS': 1000, 'WORKERS': 2})
+class SignupTests(TestCase):
+
+    """ The signup hashes the password in the pool, with the configured cost, before a single INSERT """
+
+    def test_single_insert(self):
+        # unique email check, INSERT
+        with self.assertNumQueries(2):
+            response = APIClient().post('/api/signup/', signup_payload(1), format='json')
+        self.assertEqual(response.status_code, 201)
+        user = Users.objects.get(email='inscription-1@softdesk.fr')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(user.check_password('Mot2passe!Long'))
+
+    @override_settings(ROOT_URLCONF='SoftDesk.asgi_urls')
+    async def test_async_signup(self):
+        client = AsyncClient()
+        response = await client.post('/api/signup/', signup_payload(2), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'email': 'inscription-2@softdesk.fr', 'first_name': 'Prénom',
+                                           'last_name': 'Nom 2'})
+        user = await Users.objects.aget(email='inscription-2@softdesk.fr')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+        response = await client.post('/api/signup/', dict(signup_payload(2), password2='autre'),
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+
+
+class CounterTests(TestCase):
+
+    """ The counters of the projects and issues follow the writes, and recount_counters repairs them """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, cls.issues = seed_project(cls.user, contributors=2, issues=3, comments=2)
+
+    def setUp(self):
+        response_cache.backend.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/projects/{self.project.pk}/issues/'
+
+    def counters(self):
+        project = Projects.objects.get(pk=self.project.pk)
+        return (project.issue_count, project.open_issue_count, project.comment_count, project.contributor_count)
+
+    def test_seeded(self):
+        self.assertEqual(self.counters(), (3, 3, 6, 3))
+        self.assertEqual(find_drift(), {'projects': [], 'issues': []})
+
+    def test_writes(self):
+        response = self.client.post(self.url, {
+            'title': 'Nouveau', 'description': 'Description', 'tag': 'B', 'priority': 'F', 'status': 'A',
+            'issue_assignee_user_id': self.user.pk
+        }, format='json')
+        issue_id = response.json()['id']
+        self.assertEqual(self.counters(), (4, 4, 6, 3))
+        self.client.patch(f'{self.url}{issue_id}/', {'status': 'T'}, format='json')
+        self.client.patch(f'{self.url}{issue_id}/', {'title': 'Renommé'}, format='json')
+        self.assertEqual(self.counters(), (4, 3, 6, 3))
+        self.client.post(f'{self.url}{issue_id}/comments/', {'description': 'Commentaire'}, format='json')
+        self.assertEqual(Issues.objects.get(pk=issue_id).comment_count, 1)
+        self.assertEqual(self.counters(), (4, 3, 7, 3))
+        self.client.delete(f'{self.url}{self.issues[0].pk}/')
+        self.assertEqual(self.counters(), (3, 2, 5, 3))
+        self.assertEqual(find_drift(), {'projects': [], 'issues': []})
+
+    def test_bulk(self):
+        creates = [{'title': 'Nouveau', 'description': 'Description', 'tag': 'B', 'priority': 'F', 'status': status}
+                   for status in ('A', 'T')]
+        self.client.post(f'{self.url}bulk/', {'create': creates, 'close': [self.issues[0].pk]}, format='json')
+        self.assertEqual(self.counters(), (5, 3, 6, 3))
+        self.assertEqual(find_drift(), {'projects': [], 'issues': []})
+
+    def test_drift(self):
+        Projects.objects.filter(pk=self.project.pk).update(open_issue_count=10)
+        Issues.objects.filter(pk=self.issues[0].pk).update(comment_count=0)
+        self.assertEqual(find_drift(), {
+            'projects': [(self.project.pk, 'open_issue_count', 10, 3)],
+            'issues': [(self.issues[0].pk, 'comment_count', 0, 2)],
+        })
+        with self.assertRaises(CommandError):
+            call_command('recount_counters', check=True, stdout=open(os.devnull, 'w'))
+        call_command('recount_counters', stdout=open(os.devnull, 'w'))
+        self.assertEqual(find_drift(), {'projects': [], 'issues': []})
+
+
+class CascadeDeleteTests(TestCase):
+
+    """ The rows deleted with their issue or project are handled in bulk by the pre_delete of the parent """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, cls.issues = seed_project(cls.user, contributors=2, issues=3, comments=20)
+
+    def version(self):
+        return Projects.objects.get(pk=self.project.pk).version
+
+    def test_issue_delete_bumps_the_version_once(self):
+        version = self.version()
+        self.issues[0].delete()
+        self.assertEqual(self.version(), version + 1)
+        Issues.objects.filter(pk__in=[self.issues[1].pk, self.issues[2].pk]).delete()
+        self.assertEqual(self.version(), version + 3)
+        project = Projects.objects.get(pk=self.project.pk)
+        self.assertEqual((project.issue_count, project.open_issue_count, project.comment_count), (0, 0, 0))
+        self.assertEqual(find_drift(), {'projects': [], 'issues': []})
+
+    def test_issue_counter_not_updated_by_its_deleted_comments(self):
+        Comments.objects.filter(comments_issue_id=self.issues[1]).first().delete()
+        self.assertEqual(Issues.objects.get(pk=self.issues[1].pk).comment_count, 19)
+        with CaptureQueriesContext(connection) as context:
+            self.issues[0].delete()
+        self.assertFalse([query for query in context.captured_queries
+                          if query['sql'].startswith('UPDATE "API_issues"')])
+        self.assertEqual(find_drift(), {'projects': [], 'issues': []})
+
+    def test_tombstones_inserted_at_once(self):
+        with CaptureQueriesContext(connection) as context:
+            self.issues[0].delete()
+        self.assertEqual(len([query for query in context.captured_queries
+                              if query['sql'].startswith('INSERT INTO "API_deletions"')]), 1)
+        self.assertEqual(Deletions.objects.filter(model='comments').count(), 20)
+        self.assertEqual(Deletions.objects.filter(model='issues').count(), 1)
+
+    def test_query_count_does_not_depend_on_the_comments(self):
+        Comments.objects.filter(pk__in=list(
+            Comments.objects.filter(comments_issue_id=self.issues[0]).values_list('pk', flat=True)[1:]
+        )).delete()
+        counts = []
+        for issue in self.issues[:2]:
+            with CaptureQueriesContext(connection) as context:
+                issue.delete()
+            counts.append(len(context.captured_queries))
+        # comments, comment ids, project, tombstones, search index, delete the comments then the issue
+        self.assertEqual(counts, [7, 7])
+
+    def test_comments_deleted_with_their_author(self):
+        commenter = Users.objects.create(email='commentateur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        Comments.objects.bulk_create([Comments(description='Commentaire', comments_author_user_id=commenter,
+                                               comments_issue_id=self.issues[0]) for _ in range(2)])
+        recount([self.project.pk])
+        commenter.delete()
+        self.assertEqual(find_drift(), {'projects': [], 'issues': []})
+
+    def test_project_delete(self):
+        self.project.delete()
+        self.assertFalse(Comments.objects.filter(comments_issue_id__in=self.issues).exists())
+
+
+class ProjectStatsTests(TestCase):
+
+    """ The statistics of a project are counted by one query, cached and dropped on issue writes """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, cls.issues = seed_project(cls.user, contributors=2, issues=4, comments=0)
+        Issues.objects.filter(pk=cls.issues[0].pk).update(status='T', priority='E', tag='A')
+        cls.url = f'/api/projects/{cls.project.pk}/stats/'
+
+    def setUp(self):
+        response_cache.backend.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_breakdowns(self):
+        # membership, GROUP BY, assignees
+        with self.assertNumQueries(3):
+            data = self.client.get(self.url).json()
+        self.assertEqual((data['total'], data['open']), (4, 3))
+        self.assertEqual(data['status'], [
+            {'status': 'A', 'status_long': 'À faire', 'count': 3},
+            {'status': 'E', 'status_long': 'En cours', 'count': 0},
+            {'status': 'T', 'status_long': 'Terminé', 'count': 1},
+        ])
+        self.assertEqual([item['count'] for item in data['priority']], [3, 0, 1])
+        self.assertEqual([item['count'] for item in data['tag']], [3, 1, 0])
+        self.assertEqual(data['assignee'], [{'id': self.user.pk, 'first_name': 'Prénom', 'last_name': 'Nom',
+                                             'count': 4}])
+
+    def test_cached_until_issue_write(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).json()['total'], 4)
+        self.client.delete(f'/api/projects/{self.project.pk}/issues/{self.issues[1].pk}/')
+        self.assertEqual(self.client.get(self.url).json()['total'], 3)
+
+    def test_non_member(self):
+        outsider = Users.objects.create(email='outsider@softdesk.fr', first_name='Prénom', last_name='Nom')
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+@override_settings(API_EMBEDDED_COMMENTS=3)
+class EmbeddedCommentsTests(TestCase):
+
+    """ The issue detail embeds the most recent comments only, with the count and a link to the older ones """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, issues = seed_project(cls.user, contributors=0, issues=2, comments=5)
+        cls.issue = issues[0]
+        cls.comment_ids = list(Comments.objects.filter(comments_issue_id=cls.issue).order_by(
+            'created_time', 'id').values_list('id', flat=True))
+
+    def setUp(self):
+        response_cache.backend.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/'
+
+    def test_most_recent_comments(self):
+        # membership, issue with its project and users, recent comments with their authors
+        with self.assertNumQueries(3):
+            data = self.client.get(self.url).json()
+        self.assertEqual([comment['id'] for comment in data['comments_issue']], self.comment_ids[2:])
+        self.assertEqual(data['comments_issue_count'], 5)
+        older = self.client.get(data['comments_issue_previous']).json()
+        self.assertEqual([comment['id'] for comment in older['results']], self.comment_ids[:2])
+        self.assertIsNone(older['previous'])
+
+    @override_settings(API_EMBEDDED_COMMENTS=5)
+    def test_no_link_when_every_comment_is_embedded(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(len(data['comments_issue']), 5)
+        self.assertIsNone(data['comments_issue_previous'])
+
+
+class SparseFieldsTests(TestCase):
+
+    """ ?fields= narrows the JSON and the columns read by the list query """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, issues = seed_project(cls.user, contributors=4, issues=10, comments=2)
+        cls.issue = issues[0]
+
+    def setUp(self):
+        response_cache.backend.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def list_query(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, context.captured_queries[-1]['sql']
+
+    def test_issues(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        full, full_sql = self.list_query(url)
+        narrow, narrow_sql = self.list_query(url + '?fields=id,title,status_long')
+        self.assertEqual(set(narrow.json()['results'][0]), {'id', 'title', 'status_long'})
+        self.assertNotIn('description', narrow_sql)
+        self.assertNotIn('JOIN', narrow_sql)
+        self.assertLess(len(narrow.content), len(full.content) / 2)
+
+    def test_users_joined_when_requested(self):
+        response, sql = self.list_query(f'/api/projects/{self.project.pk}/users/?fields=id,contributors_user')
+        self.assertIn('JOIN "API_users"', sql)
+        self.assertEqual(set(response.json()['results'][0]['contributors_user']), {'id', 'first_name', 'last_name'})
+        # membership, contributors joined with their users
+        response_cache.backend.clear()
+        with self.assertNumQueries(2):
+            self.client.get(f'/api/projects/{self.project.pk}/users/?fields=id,contributors_user')
+
+    def test_projects_and_comments(self):
+        response, sql = self.list_query('/api/projects/?fields=id,title,issue_count')
+        self.assertEqual(response.json()['results'], [{'id': self.project.pk, 'title': 'Projet', 'issue_count': 10}])
+        self.assertNotIn('description', sql.split('FROM')[0])
+        url = f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/?fields=id,created_time'
+        response, sql = self.list_query(url)
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'created_time'})
+        self.assertNotIn('JOIN', sql)
+
+    def test_retrieve(self):
+        data = self.client.get(f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/?fields=id,title').json()
+        self.assertEqual(data, {'id': self.issue.pk, 'title': self.issue.title})
+
+    def test_codes_rendered_when_selected(self):
+        response, sql = self.list_query(f'/api/projects/{self.project.pk}/issues/?fields=id,title,status')
+        self.assertEqual(response.json()['results'][0], {'id': self.issue.pk, 'title': self.issue.title, 'status': 'A'})
+        self.assertNotIn('description', sql)
+        data = self.client.get(f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/?fields=priority,tag').json()
+        self.assertEqual(data, {'priority': 'F', 'tag': 'B'})
+        # without ?fields= the codes stay write-only
+        self.assertNotIn('status', self.client.get(f'/api/projects/{self.project.pk}/issues/').json()['results'][0])
+
+    def test_unknown_field(self):
+        response = self.client.get(f'/api/projects/{self.project.pk}/issues/?fields=id,statut')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status_long', response.json()['fields'][0])
+
+    @override_settings(ROOT_URLCONF='SoftDesk.asgi_urls')
+    async def test_async_views(self):
+        headers = {'Authorization': f'Bearer {access_token(self.user)}'}
+        client = AsyncClient()
+        for url in (f'/api/projects/{self.project.pk}/issues/?fields=id,title,issue_assignee_user',
+                    f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/?fields=id,comments_issue_count',
+                    f'/api/projects/{self.project.pk}/issues/?fields=id,status',
+                    f'/api/projects/{self.project.pk}/issues/?fields=id,statut'):
+            response = await client.get(url, headers=headers)
+            with override_settings(ROOT_URLCONF='SoftDesk.urls'):
+                expected = await client.get(url, headers=headers)
+            self.assertEqual((response.status_code, response.json()), (expected.status_code, expected.json()))
+
+
+class IssueFiltersTests(TestCase):
+
+    """ Filters and orderings of the issues list """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, issues = seed_project(cls.user, contributors=1, issues=9, comments=0)
+        cls.other = Users.objects.get(email=f'{cls.project.pk}-0@softdesk.fr')
+        for index, issue in enumerate(issues):
+            issue.priority = 'FME'[index % 3]
+            issue.status = 'AET'[index // 3]
+            issue.tag = 'BAT'[index % 2]
+            issue.issue_assignee_user_id = cls.other if index % 2 else cls.user
+            issue.created_time = issue.created_time - timedelta(days=9 - index)
+        Issues.objects.bulk_update(issues, ['priority', 'status', 'tag', 'issue_assignee_user_id', 'created_time'])
+        cls.issues = issues
+
+    def setUp(self):
+        response_cache.backend.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/projects/{self.project.pk}/issues/'
+
+    def ids(self, query):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [issue['id'] for issue in response.json()['results']]
+
+    def all_ids(self, query):
+        ids = []
+        url = self.url + query
+        while url:
+            data = self.client.get(url).json()
+            ids += [issue['id'] for issue in data['results']]
+            url = data['next']
+        return ids
+
+    def test_filters(self):
+        issues = self.issues
+        self.assertEqual(self.ids('?status=T'), [issue.pk for issue in issues[6:]])
+        self.assertEqual(self.ids('?priority=E,M&tag=B'), [issues[index].pk for index in (2, 4, 8)])
+        self.assertEqual(self.ids(f'?assignee={self.other.pk}&status=A,E'), [issues[index].pk for index in (1, 3, 5)])
+        self.assertEqual(self.ids(f'?author={self.other.pk}'), [])
+        after = issues[7].created_time.isoformat().replace('+00:00', 'Z')
+        self.assertEqual(self.ids(f'?created_after={after}'), [issues[7].pk, issues[8].pk])
+        self.assertEqual(self.ids(f'?created_before={issues[1].created_time.date()}'), [issues[0].pk])
+
+    def test_invalid_filters(self):
+        response = self.client.get(self.url + '?status=A,X&assignee=moi&created_after=hier&ordering=title')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'status', 'assignee', 'created_after', 'ordering'})
+        self.assertIn('X', response.json()['status'][0])
+        response = self.client.get(self.url + '?ordering=title')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('-priority', response.json()['ordering'][0])
+
+    def test_orderings(self):
+        issues = self.issues
+        self.assertEqual(self.all_ids('?ordering=-created_time&page_size=2'), [issue.pk for issue in issues[::-1]])
+        by_priority = [issue.pk for priority in 'EMF' for issue in issues if issue.priority == priority]
+        self.assertEqual(self.all_ids('?ordering=-priority&page_size=2'), by_priority)
+        with override_settings(API_FAST_LIST_SERIALIZATION=True):
+            self.assertEqual(self.all_ids('?ordering=-priority&page_size=2'), by_priority)
+        self.assertEqual(self.all_ids('?ordering=priority&page_size=4&status=A,E'),
+                         [issue.pk for priority in 'FME' for issue in issues[:6] if issue.priority == priority])
+        response = self.client.get(self.url + '?ordering=-priority&fields=id,title&page_size=3')
+        self.assertEqual([issue['id'] for issue in response.json()['results']], by_priority[:3])
+        self.assertIsNone(response.json()['previous'])
+
+    @override_settings(ROOT_URLCONF='SoftDesk.asgi_urls')
+    async def test_async_views(self):
+        headers = {'Authorization': f'Bearer {access_token(self.user)}'}
+        client = AsyncClient()
+        for query in ('?ordering=-priority&page_size=4', '?status=E&tag=A', '?priority=Z'):
+            response = await client.get(self.url + query, headers=headers)
+            with override_settings(ROOT_URLCONF='SoftDesk.urls'):
+                expected = await client.get(self.url + query, headers=headers)
+            self.assertEqual((response.status_code, response.json()), (expected.status_code, expected.json()))
+
+
+@override_settings(API_CHANGES={'OVERLAP': 0, 'TOMBSTONE_RETENTION': 30})
+class ProjectChangesTests(TestCase):
+
+    """ Delta sync of a project with /api/projects/{id}/changes/ """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, cls.issues = seed_project(cls.user, contributors=2, issues=5, comments=2)
+
+    def setUp(self):
+        response_cache.backend.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/projects/{self.project.pk}/changes/'
+
+    def sync(self, since=None):
+        response = self.client.get(self.url, {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_full_then_delta(self):
+        full = self.sync()
+        self.assertEqual(full['project']['title'], 'Projet')
+        self.assertEqual((len(full['contributors']), len(full['issues']), len(full['comments'])), (3, 5, 10))
+        empty = self.sync(full['since'])
+        self.assertEqual((empty['project'], empty['contributors'], empty['issues'], empty['comments']),
+                         (None, [], [], []))
+        self.assertEqual(empty['deleted'], {'contributors': [], 'issues': [], 'comments': []})
+
+        issue = Issues.objects.get(pk=self.issues[0].pk)
+        issue.title = 'Renommé'
+        issue.save()
+        comment = Comments.objects.filter(comments_issue_id=self.issues[1]).first()
+        deleted_comment_id, deleted_issue_id = comment.pk, self.issues[2].pk
+        comment.delete()
+        Issues.objects.get(pk=deleted_issue_id).delete()
+        new_comment = Comments.objects.create(description='Nouveau', comments_author_user_id=self.user,
+                                              comments_issue_id=issue)
+        delta = self.sync(empty['since'])
+        self.assertIsNone(delta['project'])
+        # the issues of the deleted and of the new comment are sent again with their new counter
+        self.assertEqual([row['title'] for row in delta['issues']], ['Problème 1', 'Renommé'])
+        self.assertEqual([row['id'] for row in delta['comments']], [new_comment.pk])
+        self.assertEqual(delta['deleted']['issues'], [deleted_issue_id])
+        self.assertEqual(delta['deleted']['comments'][0], deleted_comment_id)
+        # the comments of the deleted issue
+        self.assertEqual(len(delta['deleted']['comments']), 3)
+
+    def test_comment_count_is_synced(self):
+        since = self.sync()['since']
+        Comments.objects.create(description='Nouveau', comments_author_user_id=self.user,
+                                comments_issue_id=self.issues[3])
+        delta = self.sync(since)
+        self.assertEqual([(row['id'], row['comment_count']) for row in delta['issues']], [(self.issues[3].pk, 3)])
+
+    def test_bulk_update_is_synced(self):
+        since = self.sync()['since']
+        response = self.client.post(f'/api/projects/{self.project.pk}/issues/bulk/',
+                                    {'close': [self.issues[3].pk]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in self.sync(since)['issues']], [self.issues[3].pk])
+
+    def test_invalid_and_expired_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'since': 'abc'}).status_code, 400)
+        old = encode_since(self.issues[0].created_time - timedelta(days=31))
+        self.assertEqual(self.client.get(self.url, {'since': old}).status_code, 410)
+        other = Users.objects.create(email='autre@softdesk.fr', first_name='Prénom', last_name='Nom')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_tombstones_purged(self):
+        Issues.objects.get(pk=self.issues[4].pk).delete()
+        Deletions.objects.update(deleted_time=self.issues[4].created_time - timedelta(days=31))
+        Comments.objects.filter(comments_issue_id=self.issues[0]).first().delete()
+        call_command('purge_deletions', stdout=open(os.devnull, 'w'))
+        self.assertEqual(Deletions.objects.count(), 1)
+        self.project.delete()
+        self.assertFalse(Deletions.objects.exists())
+
+
+@override_settings(ROOT_URLCONF='SoftDesk.asgi_urls')
+class ProjectEventsTests(TestCase):
+
+    """ Server-Sent Events of the issues and comments of a project """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Users.objects.create(email='auteur@softdesk.fr', first_name='Prénom', last_name='Nom')
+        cls.project, cls.issues = seed_project(cls.user, contributors=1, issues=2, comments=1)
+
+    async def test_slow_consumer_gets_a_resync(self):
+        broker = EventBroker(queue_size=2)
+        subscription = broker.subscribe(self.project.pk)
+        for index in range(3):
+            broker.publish(self.project.pk, ('issue.updated', json.dumps({'id': index})))
+        await asyncio.sleep(0)
+        self.assertEqual(await subscription.get(1), RESYNC)
+        self.assertIsNone(await subscription.get(0.01))
+        broker.unsubscribe(subscription)
+        self.assertFalse(broker.wanted(self.project.pk))
+
+    async def test_fanout_between_brokers(self):
+        publisher = EventBroker(fanout=RedisFanout(client_class=LocalPubSubClient, prefix='test-fanout'))
+        worker = EventBroker(fanout=RedisFanout(client_class=LocalPubSubClient, prefix='test-fanout'))
+        subscription = worker.subscribe(self.project.pk)
+        publisher.publish(self.project.pk, ('comment.deleted', '{"id": 1}'))
+        self.assertEqual(await subscription.get(2), ('comment.deleted', '{"id": 1}'))
+
+    async def test_stream(self):
+        client = AsyncClient()
+        url = f'/api/projects/{self.project.pk}/events/'
+        self.assertEqual((await client.get(url)).status_code, 401)
+        outsider = await Users.objects.acreate(email='autre@softdesk.fr')
+        response = await client.get(url, headers={'Authorization': f'Bearer {access_token(outsider)}'})
+        self.assertEqual(response.status_code, 403)
+
+        response = await client.get(url, headers={'Authorization': f'Bearer {access_token(self.user)}'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        ready = (await anext(stream)).decode()
+        self.assertTrue(ready.startswith('event: ready\ndata: {"since": '))
+
+        def write():
+            with self.captureOnCommitCallbacks(execute=True):
+                issue = Issues.objects.get(pk=self.issues[0].pk)
+                issue.title = 'Renommé'
+                issue.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                Comments.objects.filter(comments_issue_id=self.issues[1]).delete()
+            with self.captureOnCommitCallbacks(execute=True):
+                Issues.objects.get(pk=self.issues[0].pk).delete()
+
+        await sync_to_async(write)()
+        updated = (await asyncio.wait_for(anext(stream), 2)).decode()
+        self.assertTrue(updated.startswith('event: issue.updated\n'))
+        self.assertEqual(json.loads(updated.split('data: ')[1])['title'], 'Renommé')
+        deleted = (await asyncio.wait_for(anext(stream), 2)).decode()
+        self.assertTrue(deleted.startswith('event: comment.deleted\n'))
+        # the issue then the comments deleted with it
+        cascade = [(await asyncio.wait_for(anext(stream), 2)).decode().split('\n')[0] for _ in range(2)]
+        self.assertEqual(cascade, ['event: issue.deleted', 'event: comment.deleted'])
+        await stream.aclose()
+        await sync_to_async(response.close)()
+        self.assertFalse(event_broker.wanted(self.project.pk))
+
+    async def test_project_deletion_ends_the_stream(self):
+        client = AsyncClient()
+        response = await client.get(f'/api/projects/{self.project.pk}/events/',
+                                    headers={'Authorization': f'Bearer {access_token(self.user)}'})
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+
+        def delete():
+            with self.captureOnCommitCallbacks(execute=True):
+                Projects.objects.get(pk=self.project.pk).delete()
+
+        await sync_to_async(delete)()
+        deleted = (await asyncio.wait_for(anext(stream), 2)).decode()
+        self.assertEqual(deleted, f'event: project.deleted\ndata: {{"id": {self.project.pk}}}\n\n')
+        with self.assertRaises(StopAsyncIteration):
+            await asyncio.wait_for(anext(stream), 2)
+        # unsubscribed by the stream itself, before the response is closed
+        self.assertFalse(event_broker.wanted(self.project.pk))
+
+    @override_settings(API_EVENTS={**settings.API_EVENTS, 'KEEPALIVE': 0.05})
+    async def test_stream_ends_after_the_disconnection(self):
+        disconnected = asyncio.Event()
+        stream = event_stream(event_broker.subscribe(self.project.pk), disconnected)
+        self.assertTrue((await anext(stream)).startswith('event: ready\n'))
+        self.assertEqual(await anext(stream), ': keepalive\n\n')
+        disconnected.set()
+        with self.assertRaises(StopAsyncIteration):
+            await asyncio.wait_for(anext(stream), 1)
+        self.assertFalse(event_broker.wanted(self.project.pk))
+
+        # a server raising on the write to the closed connection closes the stream
+        stream = event_stream(event_broker.subscribe(self.project.pk))
+        await anext(stream)
+        await stream.aclose()
+        self.assertFalse(event_broker.wanted(self.project.pk))
+
+    async def test_disconnect_watcher(self):
+        scopes = []
+
+        async def application(scope, receive, send):
+            scopes.append(scope)
+            self.assertEqual((await receive())['type'], 'http.request')
+            await asyncio.wait_for(scope['softdesk.disconnected'].wait(), 1)
+            await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+            await send({'type': 'http.response.body'})
+
+        communicator = ApplicationCommunicator(DisconnectWatcher(application), {'type': 'http'})
+        await communicator.send_input({'type': 'http.request', 'body': b''})
+        await asyncio.sleep(0.05)
+        self.assertFalse(scopes[0]['softdesk.disconnected'].is_set())
+        await communicator.send_input({'type': 'http.disconnect'})
+        self.assertEqual((await communicator.receive_output(1))['status'], 200)
+        await communicator.wait(1)
+
+
+class SQLiteProductionProfileTests(TestCase):
+
+    """ The production profile of the SQLite database (API.sqlite) """
+
+    def test_pragmas_and_immediate_transactions(self):
+        with temporary_database('profile', settings.SQLITE_PRODUCTION_DATABASE) as alias:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'wal')
+                cursor.execute('PRAGMA synchronous')
+                self.assertEqual(cursor.fetchone()[0], 1)
+                cursor.execute('PRAGMA cache_size')
+                self.assertEqual(cursor.fetchone()[0], -65536)
+            with CaptureQueriesContext(connections[alias]) as context:
+                with transaction.atomic(using=alias):
+                    Users.objects.using(alias).bulk_create([Users(email='profil@softdesk.fr')])
+            self.assertEqual(context.captured_queries[0]['sql'], 'BEGIN IMMEDIATE')
+            self.assertIsNone(connections[alias].held_write_lock)
+
+    def test_concurrent_writers_dont_fail(self):
+        with temporary_database('writers', settings.SQLITE_PRODUCTION_DATABASE) as alias:
+            result = concurrent_writes(alias, writers=4, transactions=10)
+            self.assertEqual((result['committed'], result['errors']), (40, 0))
+            self.assertEqual(Issues.objects.using(alias).count(), 40)
+
+    def test_autocommit_writes_wait_for_the_write_lock(self):
+        with temporary_database('autocommit', settings.SQLITE_PRODUCTION_DATABASE) as alias:
+            user, = Users.objects.using(alias).bulk_create([Users(email='autocommit@softdesk.fr')])
+            lock = write_lock(connections[alias].settings_dict['NAME'])
+            written = threading.Event()
+
+            def save():
+                try:
+                    Users.objects.using(alias).filter(pk=user.pk).update(first_name='Écrit')
+                    written.set()
+                finally:
+                    connections[alias].close()
+
+            with lock:
+                writer = threading.Thread(target=save)
+                writer.start()
+                self.assertFalse(written.wait(0.3))
+            writer.join()
+            self.assertTrue(written.is_set())
+            self.assertEqual(Users.objects.using(alias).get(pk=user.pk).first_name, 'Écrit')
+
+    def test_autocommit_writes_under_contention(self):
+        # the busy handler of SQLite gives up at once : only the write lock of the process orders the writers
+        profile = settings.SQLITE_PRODUCTION_DATABASE
+        with temporary_database('contention', {**profile, 'OPTIONS': {**profile['OPTIONS'], 'timeout': 0}}) as alias:
+            user, = Users.objects.using(alias).bulk_create([Users(email='contention@softdesk.fr')])
+            project, = Projects.objects.using(alias).bulk_create([Projects(
+                title='Projet', description='Description', project_type='B', project_author_user_id=user
+            )])
+            errors = []
+
+            def write(atomic):
+                try:
+                    for index in range(20):
+                        projects = Projects.objects.using(alias).filter(pk=project.pk)
+                        try:
+                            if atomic:
+                                with transaction.atomic(using=alias):
+                                    projects.update(version=F('version') + 1)
+                            else:
+                                projects.update(version=F('version') + 1)
+                        except OperationalError as error:
+                            errors.append(error)
+                finally:
+                    connections[alias].close()
+
+            writers = [threading.Thread(target=write, args=(index % 2 == 0,)) for index in range(6)]
+            for writer in writers:
+                writer.start()
+            for writer in writers:
+                writer.join()
+            self.assertEqual(errors, [])
+            self.assertEqual(Projects.objects.using(alias).get(pk=project.pk).version, 120)
+
+    def test_read_only_block_skips_the_write_lock(self):
+        with temporary_database('reader', settings.SQLITE_PRODUCTION_DATABASE) as alias:
+            with write_lock(connections[alias].settings_dict['NAME']):
+                with CaptureQueriesContext(connections[alias]) as context:
+                    with read_only_atomic(using=alias):
+                        self.assertEqual(Users.objects.using(alias).count(), 0)
+                        self.assertIsNone(connections[alias].held_write_lock)
+            self.assertEqual(context.captured_queries[0]['sql'], 'BEGIN')
+            self.assertFalse(connections[alias].read_only_block)
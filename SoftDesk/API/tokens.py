@@ -0,0 +1,180 @@
+""" Refresh tokens revoked through the token_blacklist app of simplejwt, with an in-memory front.
+The JTIs of the blacklisted tokens are kept in a Bloom filter : a token absent from the filter is not
+blacklisted and is accepted without a query, a token present in it is checked in the database.
+A background thread adds the tokens blacklisted by the other processes to the filter and purges the
+expired tokens from the tables """
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch
+
+logger = logging.getLogger('API.tokens')
+
+# a token blacklisted just before a sync may be committed just after it, the syncs overlap by this much
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class BloomFilter:
+
+    """ Set of strings answering "maybe present" or "absent" in a fixed number of bits.
+    Sized for capacity items with a false positive rate of error_rate """
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + index * second) % self.size for index in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BlacklistFront:
+
+    """ Bloom filter of the blacklisted JTIs, kept in sync with the BlacklistedToken table """
+
+    def __init__(self, capacity=100000, error_rate=0.001, sync_interval=30, purge_interval=3600):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.purge_interval = purge_interval
+        self.filter = None
+        self.synced_at = None
+        self.purged_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def load(self):
+
+        """ Rebuild the filter from the blacklisted tokens which are not expired yet """
+
+        synced_at = aware_utcnow()
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        for jti in BlacklistedToken.objects.filter(
+            token__expires_at__gt=synced_at
+        ).values_list('token__jti', flat=True).iterator():
+            bloom.add(jti)
+        self.filter, self.synced_at = bloom, synced_at
+
+    def ensure_loaded(self):
+        with self._lock:
+            if self.filter is None:
+                self.load()
+            if self._thread is None and self.sync_interval:
+                self._thread = threading.Thread(target=self.run, name='token-blacklist', daemon=True)
+                self._thread.start()
+
+    def add(self, jti):
+        self.ensure_loaded()
+        self.filter.add(jti)
+
+    def maybe_blacklisted(self, jti):
+        self.ensure_loaded()
+        return jti in self.filter
+
+    def sync(self):
+
+        """ Add the tokens blacklisted since the last sync, by this process or another one """
+
+        synced_at = aware_utcnow()
+        for jti in BlacklistedToken.objects.filter(
+            blacklisted_at__gte=self.synced_at - SYNC_OVERLAP
+        ).values_list('token__jti', flat=True).iterator():
+            self.filter.add(jti)
+        self.synced_at = synced_at
+
+    def purge(self):
+
+        """ Delete the expired tokens, the blacklist entries go with them, then start a clean filter """
+
+        OutstandingToken.objects.filter(expires_at__lte=aware_utcnow()).delete()
+        with self._lock:
+            self.load()
+        self.purged_at = time.monotonic()
+
+    def run(self):
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                if time.monotonic() - self.purged_at >= self.purge_interval:
+                    self.purge()
+                else:
+                    self.sync()
+            except DatabaseError:
+                logger.exception("Échec de la synchronisation de la liste des jetons révoqués")
+            finally:
+                close_old_connections()
+
+
+def build_blacklist_front():
+
+    """ Build the front of the blacklist from the API_TOKEN_BLACKLIST setting """
+
+    config = getattr(settings, 'API_TOKEN_BLACKLIST', {})
+    return BlacklistFront(
+        capacity=config.get('CAPACITY', 100000),
+        error_rate=config.get('ERROR_RATE', 0.001),
+        sync_interval=config.get('SYNC_INTERVAL', 30),
+        purge_interval=config.get('PURGE_INTERVAL', 3600),
+    )
+
+
+blacklist_front = build_blacklist_front()
+
+
+class FrontedRefreshToken(RefreshToken):
+
+    """ RefreshToken checking the blacklist through blacklist_front """
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if blacklist_front.maybe_blacklisted(jti) and BlacklistedToken.objects.filter(token__jti=jti).exists():
+            raise TokenError("Le jeton a été révoqué")
+
+    def blacklist(self):
+
+        """ Blacklist the token, fail if it already was : two refreshes racing with the same token get a
+        single new pair, whatever the process which answers them """
+
+        jti = self.payload[api_settings.JTI_CLAIM]
+        with transaction.atomic():
+            token, _ = OutstandingToken.objects.get_or_create(jti=jti, defaults={
+                'token': str(self),
+                'expires_at': datetime_from_epoch(self.payload['exp']),
+            })
+            blacklisted, created = BlacklistedToken.objects.get_or_create(token=token)
+        blacklist_front.add(jti)
+        if not created:
+            raise TokenError("Le jeton a été révoqué")
+        return blacklisted, created
+
+
+class FrontedTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = FrontedRefreshToken
+
+
+class FrontedTokenRefreshSerializer(TokenRefreshSerializer):
+
+    """ TokenRefreshSerializer whose rotation revokes the refresh token used """
+
+    token_class = FrontedRefreshToken
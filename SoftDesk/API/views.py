@@ -1,22 +1,41 @@
+from urllib.parse import urlencode
+
 import django.db.utils
-from django.core.exceptions import PermissionDenied
-from django.db.models import Q
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, PermissionDenied
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import parse_etags
 from rest_framework import generics
 from rest_framework.decorators import action
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework import status
 from rest_framework.viewsets import ModelViewSet
 from rest_framework_simplejwt.tokens import AccessToken
 from API.serializers import SignupSerializer, \
     ProjectsListSerializer, \
     ProjectsDetailSerializer, \
-    UsersSerializer, IssuesListSerializer, IssuesDetailSerializer, CommentsListSerializer, CommentsDetailSerializer
+    UsersSerializer, IssuesListSerializer, IssuesDetailSerializer, CommentsListSerializer, CommentsDetailSerializer, \
+    recent_comments_prefetch
 
 from API.models import Projects, Users, Contributors, Issues, Comments
 
-from API.permissions import ProjectPermissions
+from API.cache import response_cache
+from API.changes import project_changes
+from API.events import publish_instances
+from API.exports import EXPORT_FORMATS, export_lines, project_records
+from API.fast_serializers import FastProjectsListSerializer, FastIssuesListSerializer, FastCommentsListSerializer
+from API.filters import filter_issues
+from API.pagination import CreatedTimeCursorPagination, IssuesCursorPagination
+from API.search import search_backend
+from API.signals import project_changed
+from API.stats import project_stats
+from API.permissions import ProjectPermissions, get_project_membership, is_project_member, is_project_owner
 
 
 class MultipleSerializerMixin:
@@ -40,6 +59,143 @@ class MultipleSerializerMixin:
         return Response(user)
 
 
+def etag_matches(etag, if_none_match):
+
+    """ Weak comparison of an ETag with the value of an If-None-Match header """
+
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag.removeprefix('W/') in [value.removeprefix('W/') for value in etags]
+
+
+class CachedReadMixin:
+
+    """ View used to serve the read actions of a project with an ETag built from the project version,
+    answering If-None-Match with a 304, and from the response cache keyed by project and permission """
+
+    cached_actions = ('list', 'retrieve')
+    cache_project_kwarg = 'project_pk'
+
+    def cached_read(self, read, request, *args, **kwargs):
+        if self.action not in self.cached_actions:
+            return read(request, *args, **kwargs)
+        project_id = self.kwargs.get(self.cache_project_kwarg)
+        membership = get_project_membership(request, project_id)
+        if membership is None:
+            return read(request, *args, **kwargs)
+        etag = f'W/"{project_id}.{membership.project_version}.{request.accepted_renderer.format}"'
+        if etag_matches(etag, request.META.get('HTTP_IF_NONE_MATCH')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        if response_cache is None:
+            response = read(request, *args, **kwargs)
+        else:
+            key = response_cache.make_key(project_id, membership.project_version, membership.permission,
+                                          request.build_absolute_uri())
+            data = response_cache.get(key)
+            if data is not None:
+                return Response(data, headers={'ETag': etag})
+            response = read(request, *args, **kwargs)
+            if response.status_code == 200:
+                response_cache.set(key, response.data)
+        if response.status_code == 200:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_read(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_read(super().retrieve, request, *args, **kwargs)
+
+
+class FastListMixin:
+
+    """ View used to serialize the list action from values() rows when API_FAST_LIST_SERIALIZATION is True """
+
+    fast_list_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        # a ?fields= selection is read by the model serializer, from the columns it needs
+        if not settings.API_FAST_LIST_SERIALIZATION or self.fast_list_serializer_class is None or \
+                request.query_params.get('fields'):
+            return super().list(request, *args, **kwargs)
+        serializer = self.fast_list_serializer_class()
+        queryset = self.filter_queryset(self.get_queryset()).values(*serializer.columns)
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(serializer.to_representation(queryset))
+        return self.get_paginated_response(serializer.to_representation(page))
+
+
+def parse_fields(value, serializer_class):
+
+    """ Return the field names of a ?fields=a,b,c parameter, raise a ValidationError if one of them isn't
+    rendered by serializer_class, or selectable among its write-only codes """
+
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    readable = [name for name, field in serializer_class().fields.items()
+                if not field.write_only or name in serializer_class.selectable_codes]
+    unknown = [field for field in fields if field not in readable]
+    if unknown:
+        raise ValidationError({'fields': [f"Champs inconnus : {', '.join(unknown)}. "
+                                          f"Champs possibles : {', '.join(readable)}"]})
+    return fields
+
+
+def narrow_queryset(queryset, fields, sparse_columns, ordering=()):
+
+    """ Only read the columns needed to render fields (and to sort), joining only the relations they show.
+    sparse_columns maps the fields which aren't model fields to their columns """
+
+    columns = {'id'} | {column.lstrip('-') for column in ordering or ()}
+    for field in fields:
+        if field in sparse_columns:
+            columns.update(sparse_columns[field])
+            continue
+        try:
+            queryset.model._meta.get_field(field)
+        except FieldDoesNotExist:
+            # a field computed from columns sparse_columns doesn't know, every column is read
+            return queryset
+        columns.add(field)
+    relations = {column.split('__')[0] for column in columns if '__' in column}
+    queryset = queryset.select_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    return queryset.only(*columns, *relations)
+
+
+class SparseFieldsMixin:
+
+    """ View rendering only the serializer fields listed by ?fields=a,b,c on the read actions,
+    the list query only reads the columns these fields need """
+
+    sparse_actions = ('list', 'retrieve')
+    sparse_columns = {}
+
+    def sparse_fields(self):
+        if self.action not in self.sparse_actions or not self.request.query_params.get('fields'):
+            return None
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = parse_fields(self.request.query_params['fields'], self.get_serializer_class())
+        return self._sparse_fields
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.sparse_fields()
+        if fields:
+            kwargs['requested_fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.sparse_fields()
+        if not fields or self.action != 'list':
+            return queryset
+        ordering = self.paginator.get_ordering(self.request, queryset, self) if self.paginator else None
+        return narrow_queryset(queryset, fields, self.sparse_columns, ordering)
+
+
 class SignupView(generics.CreateAPIView):
 
     """ view used to sign up """
@@ -48,19 +204,67 @@ class SignupView(generics.CreateAPIView):
     serializer_class = SignupSerializer
 
 
-class ProjectsViewset(MultipleSerializerMixin, ModelViewSet):
+class SearchView(generics.GenericAPIView):
+
+    """ view used to search the issues and comments of the user's projects, ?q=words&cursor=...
+    The pages of a search are only consistent while the index doesn't change (see SQLiteFTSBackend) """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if search_backend is None:
+            raise NotFound("La recherche n'est pas activée")
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'detail': "Le paramètre q est obligatoire"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('page_size', settings.REST_FRAMEWORK['PAGE_SIZE']))
+        except ValueError:
+            limit = settings.REST_FRAMEWORK['PAGE_SIZE']
+        limit = max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+        results, next_cursor = search_backend.search(request.user.pk, query,
+                                                     cursor=request.query_params.get('cursor'), limit=limit)
+        next_url = None
+        if next_cursor:
+            next_url = request.build_absolute_uri(
+                f"{request.path}?{urlencode({'q': query, 'page_size': limit, 'cursor': next_cursor})}"
+            )
+        return Response({'next': next_url, 'results': results})
+
+
+class ProjectsViewset(CachedReadMixin, FastListMixin, SparseFieldsMixin, MultipleSerializerMixin, ModelViewSet):
 
     """ view used to manage projects """
 
+    cached_actions = ('retrieve', 'stats')
+    cache_project_kwarg = 'pk'
     serializer_class = ProjectsListSerializer
     detail_serializer_class = ProjectsDetailSerializer
+    fast_list_serializer_class = FastProjectsListSerializer
     permission_classes = [IsAuthenticated, ProjectPermissions]
+    sparse_columns = {
+        'project_type_long': ('project_type',),
+        'project_author_user': ('project_author_user_id__first_name', 'project_author_user_id__last_name'),
+    }
 
     def get_queryset(self):
         queryset = Projects.objects.all()
+        if self.action == 'list':
+            # the (user, project) unique index of Contributors drives the join, so the listing only
+            # reads the projects of the user
+            queryset = queryset.filter(
+                contributors_project_id__contributors_user_id=self.request.user.pk
+            ).select_related('project_author_user_id')
+        if self.action == 'retrieve':
+            queryset = queryset.select_related('project_author_user_id').prefetch_related(
+                Prefetch('contributors_project_id',
+                         queryset=Contributors.objects.select_related('contributors_user_id')),
+                Prefetch('issue_project_id',
+                         queryset=Issues.objects.select_related('issue_author_user_id', 'issue_assignee_user_id'))
+            )
         project_id = self.request.GET.get('projects_id')
         if project_id:
-            queryset = queryset.filter(projects_id=project_id)
+            queryset = queryset.filter(pk=project_id) if project_id.isdigit() else queryset.none()
         return queryset
 
     def perform_create(self, serializer):
@@ -75,13 +279,59 @@ class ProjectsViewset(MultipleSerializerMixin, ModelViewSet):
     def perform_update(self, serializer):
         project = serializer.save(project_author_user_id=self.request.user)
 
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+
+        """ Number of issues of the project by status, priority, tag and assignee, served from the response
+        cache until an issue of the project is written """
+
+        return self.cached_read(self.read_stats, request, pk=pk)
+
+    def read_stats(self, request, pk=None):
+        if not is_project_member(request, pk):
+            raise PermissionDenied()
+        return Response(project_stats(pk))
+
+    @action(detail=True, methods=['get'])
+    def changes(self, request, pk=None):
 
-class ProjectContributorsViewset(ModelViewSet):
+        """ Contributors, issues and comments created, updated or deleted since ?since=<cursor of the previous
+        sync>, everything without it, with the cursor of the next sync (see API.changes) """
+
+        if not is_project_member(request, pk):
+            raise PermissionDenied()
+        return Response(project_changes(pk, request.query_params.get('since')))
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+
+        """ Stream every issue of the project followed by its comments, as NDJSON (default) or CSV
+        with ?export_format=csv """
+
+        if not is_project_member(request, pk):
+            raise PermissionDenied()
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response({'detail': f"Format d'export inconnu, choix possibles : {', '.join(EXPORT_FORMATS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(
+            export_lines(export_format, project_records(pk, settings.API_EXPORT_CHUNK_SIZE)),
+            content_type=EXPORT_FORMATS[export_format][2]
+        )
+        response['Content-Disposition'] = f'attachment; filename="project-{pk}.{export_format}"'
+        return response
+
+
+class ProjectContributorsViewset(CachedReadMixin, SparseFieldsMixin, ModelViewSet):
 
     """ view used to manage contributors """
 
     permission_classes = [IsAuthenticated]
     serializer_class = UsersSerializer
+    sparse_columns = {
+        'contributors_user': ('contributors_user_id__first_name', 'contributors_user_id__last_name'),
+        'role_long': ('role',),
+    }
 
     queryset = Contributors.objects.all().select_related(
         'contributors_project_id'
@@ -89,30 +339,15 @@ class ProjectContributorsViewset(ModelViewSet):
 
     def get_queryset(self, *args, **kwargs):
         project_id = self.kwargs.get("project_pk")
-        project_contributors = []
-        project_contributors_req = Contributors.objects.filter(contributors_project_id=project_id)
-        for project_contributor in project_contributors_req:
-            project_contributors.append(project_contributor.contributors_user_id)
-        if self.request.user in project_contributors:
-            try:
-                project = Projects.objects.get(id=project_id)
-            except Projects.DoesNotExist:
-                raise NotFound("Il n'y a pas de projet avec cet ID")
-            project_query = self.queryset.filter(contributors_project_id=project)
-            return project_query
+        if is_project_member(self.request, project_id):
+            return self.queryset.filter(contributors_project_id=project_id)
         else:
             raise PermissionDenied()
 
     def perform_create(self, serializer):
         project_id = self.kwargs.get("project_pk")
-        project = Projects.objects.get(id=project_id)
-
-        project_owner_req = Contributors.objects.filter(
-            Q(contributors_project_id=project),
-            Q(permission='CP'))
-        for project_owner_r in project_owner_req:
-            project_owner = project_owner_r.contributors_user_id
-        if self.request.user == project_owner:
+        if is_project_owner(self.request, project_id):
+            project = get_object_or_404(Projects, id=project_id)
             try:
                 serializer.save(contributors_project_id=project, permission='LI')
             except django.db.utils.IntegrityError:
@@ -122,57 +357,57 @@ class ProjectContributorsViewset(ModelViewSet):
 
     def perform_destroy(self, serializer):
         project_id = self.kwargs.get("project_pk")
-        project = Projects.objects.get(id=project_id)
         contributor_id = self.kwargs.get("pk")
-        contributor = get_object_or_404(Contributors, id=contributor_id)
-
-        project_owner_req = Contributors.objects.filter(
-            Q(contributors_project_id=project),
-            Q(permission='CP'))
-        for project_owner_r in project_owner_req:
-            project_owner = project_owner_r.contributors_user_id
-        if self.request.user == project_owner:
+        contributor = get_object_or_404(Contributors, id=contributor_id, contributors_project_id=project_id)
+        if is_project_owner(self.request, project_id):
             contributor.delete()
         else:
             raise PermissionDenied()
 
 
-class ProjectIssuesViewer(MultipleSerializerMixin, ModelViewSet):
+class ProjectIssuesViewer(CachedReadMixin, FastListMixin, SparseFieldsMixin, MultipleSerializerMixin, ModelViewSet):
 
-    """ View used to manage Project issues """
+    """ View used to manage Project issues, the list is filtered by the parameters of API.filters and
+    ordered by ?ordering= (see IssuesCursorPagination) """
 
+    pagination_class = IssuesCursorPagination
     permission_classes = [IsAuthenticated]
     serializer_class = IssuesListSerializer
     detail_serializer_class = IssuesDetailSerializer
+    fast_list_serializer_class = FastIssuesListSerializer
+    sparse_columns = {
+        'tag_long': ('tag',),
+        'priority_long': ('priority',),
+        'status_long': ('status',),
+        'issue_author_user': ('issue_author_user_id__first_name', 'issue_author_user_id__last_name'),
+        'issue_assignee_user': ('issue_assignee_user_id__first_name', 'issue_assignee_user_id__last_name'),
+    }
 
     queryset = Issues.objects.all().select_related(
-        'issue_project_id'
+        'issue_project_id',
+        'issue_author_user_id',
+        'issue_assignee_user_id'
     )
 
     def get_queryset(self, *args, **kwargs):
         project_id = self.kwargs.get("project_pk")
-        project = Projects.objects.get(id=project_id)
-        project_contributors = []
-        project_contributors_req = Contributors.objects.filter(contributors_project_id=project_id)
         issue_id = self.kwargs.get('pk')
-        queryset = Issues.objects.all().filter(issue_project_id=project)
-        for project_contributor in project_contributors_req:
-            project_contributors.append(project_contributor.contributors_user_id)
-        if self.request.user in project_contributors:
+        if is_project_member(self.request, project_id):
+            queryset = self.queryset.filter(issue_project_id=project_id)
             if issue_id:
                 queryset = queryset.filter(id=issue_id)
+            if self.action == 'list':
+                queryset = filter_issues(queryset, self.request.query_params)
+            if self.action == 'retrieve':
+                queryset = queryset.prefetch_related(recent_comments_prefetch())
             return queryset
         else:
             raise PermissionDenied()
 
     def perform_create(self, serializer):
         project_id = self.kwargs.get("project_pk")
-        project = Projects.objects.get(id=project_id)
-        project_contributors = []
-        project_contributors_req = Contributors.objects.filter(contributors_project_id=project)
-        for project_contributor in project_contributors_req:
-            project_contributors.append(project_contributor.contributors_user_id)
-        if self.request.user in project_contributors:
+        if is_project_member(self.request, project_id):
+            project = Projects.objects.get(id=project_id)
             try:
                 serializer.save(issue_project_id=project, issue_author_user_id=self.request.user,
                                 issue_assignee_user_id=self.request.user)
@@ -201,34 +436,125 @@ class ProjectIssuesViewer(MultipleSerializerMixin, ModelViewSet):
         else:
             raise PermissionDenied()
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, *args, **kwargs):
 
-class IssueCommentsViewer(MultipleSerializerMixin, ModelViewSet):
+        """ Create, update and close issues of the project in one transaction.
+        Body : {"create": [issue, ...], "update": [{"id": ..., field: value}, ...], "close": [id, ...]}
+        Nothing is written if an item is invalid, the errors are returned at the index of the item """
+
+        project_id = self.kwargs.get("project_pk")
+        if not is_project_member(request, project_id):
+            raise PermissionDenied()
+        if not isinstance(request.data, dict):
+            return Response({'non_field_errors': ['Veuillez envoyer un objet {"create": [...], "update": [...], '
+                                                  '"close": [...]}']}, status=status.HTTP_400_BAD_REQUEST)
+        body_errors = {}
+        for name in ('create', 'update', 'close'):
+            items = request.data.get(name, [])
+            if not isinstance(items, list):
+                body_errors[name] = {'non_field_errors': ["Veuillez indiquer une liste"]}
+            elif name != 'close':
+                item_errors = [{} if isinstance(item, dict) else {'non_field_errors': ["Veuillez indiquer un objet"]}
+                               for item in items]
+                if any(item_errors):
+                    body_errors[name] = item_errors
+        if body_errors:
+            return Response(body_errors, status=status.HTTP_400_BAD_REQUEST)
+        creates = request.data.get('create', [])
+        updates = list(request.data.get('update', []))
+        closes = request.data.get('close', [])
+        if len(creates) + len(updates) + len(closes) > settings.API_BULK_MAX_ITEMS:
+            return Response({'detail': f"Pas plus de {settings.API_BULK_MAX_ITEMS} problèmes par requête"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        updates += [{'id': issue_id, 'status': 'T'} for issue_id in closes]
+
+        create_serializer = IssuesListSerializer(data=creates, many=True)
+        create_errors = [] if create_serializer.is_valid() else create_serializer.errors
+        update_serializer = IssuesListSerializer(data=updates, many=True, partial=True)
+        update_errors = [] if update_serializer.is_valid() else update_serializer.errors
+
+        update_ids = [item.get('id') if isinstance(item, dict) else None for item in updates]
+        issues = Issues.objects.select_related('issue_author_user_id', 'issue_assignee_user_id').in_bulk(
+            [issue_id for issue_id in update_ids if str(issue_id).isdigit()]
+        )
+        if not update_errors:
+            update_errors = [{} for _ in updates]
+        for index, issue_id in enumerate(update_ids):
+            issue = issues.get(int(issue_id)) if str(issue_id).isdigit() else None
+            if issue is None or str(issue.issue_project_id_id) != str(project_id):
+                update_errors[index]['id'] = ["Ce problème n'existe pas dans ce projet"]
+            elif issue.issue_assignee_user_id_id != request.user.pk:
+                update_errors[index]['id'] = ["Seul l'utilisateur assigné peut modifier ce problème"]
+        if not any(update_errors):
+            update_errors = []
+        if create_errors or update_errors:
+            return Response({'create': create_errors, 'update': update_errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        project = Projects.objects.get(id=project_id)
+        created = [
+            Issues(issue_project_id=project, issue_author_user_id=request.user, issue_assignee_user_id=request.user,
+                   **validated_data)
+            for validated_data in create_serializer.validated_data
+        ]
+        updated = {}
+        updated_fields = set()
+        now = timezone.now()
+        for issue_id, validated_data in zip(update_ids, update_serializer.validated_data):
+            issue = issues[int(issue_id)]
+            for field, value in validated_data.items():
+                setattr(issue, field, value)
+            # bulk_update doesn't fill the auto_now field
+            issue.updated_time = now
+            updated_fields.update(validated_data, ['updated_time'])
+            updated[issue.pk] = issue
+        with transaction.atomic():
+            Issues.objects.bulk_create(created)
+            if updated_fields:
+                Issues.objects.bulk_update(updated.values(), sorted(updated_fields))
+            if search_backend is not None:
+                search_backend.index_issues(created + list(updated.values()))
+            # the version and the counters are committed with the issues, the events once they are
+            project_changed(
+                project.pk,
+                issue_count=len(created),
+                open_issue_count=sum(issue.is_open for issue in created) + sum(
+                    issue.is_open - (issue.loaded_status != Issues.TERMINE) for issue in updated.values()
+                )
+            )
+            transaction.on_commit(lambda: publish_instances(project.pk, created, 'created'))
+            transaction.on_commit(lambda: publish_instances(project.pk, updated.values(), 'updated'))
+        return Response({
+            'created': IssuesListSerializer(created, many=True).data,
+            'updated': IssuesListSerializer(updated.values(), many=True).data
+        }, status=status.HTTP_200_OK)
+
+
+class IssueCommentsViewer(CachedReadMixin, FastListMixin, SparseFieldsMixin, MultipleSerializerMixin, ModelViewSet):
 
     """ View used to manage Comment's issues """
 
+    pagination_class = CreatedTimeCursorPagination
     permission_classes = [IsAuthenticated, ]
     serializer_class = CommentsListSerializer
     detail_serializer_class = CommentsDetailSerializer
+    fast_list_serializer_class = FastCommentsListSerializer
+    sparse_columns = {
+        'comments_author_user': ('comments_author_user_id__first_name', 'comments_author_user_id__last_name'),
+    }
 
     queryset = Comments.objects.all().select_related(
-        'comments_issue_id'
+        'comments_issue_id',
+        'comments_author_user_id'
     )
 
     def get_queryset(self, *args, **kwargs):
         project_id = self.kwargs.get("project_pk")
-        project_contributors = []
-        project_contributors_req = Contributors.objects.filter(contributors_project_id=project_id)
         issue_id = self.kwargs.get('issues_pk')
-        issue = Issues.objects.get(id=issue_id)
         comment_id = self.kwargs.get('pk')
-        project_issues = []
-        project_issues_req = Issues.objects.all().filter(issue_project_id=project_id)
-        queryset = Comments.objects.all().filter(comments_issue_id=issue)
-        for project_issue in project_issues_req:
-            project_issues.append(project_issue)
-        for project_contributor in project_contributors_req:
-            project_contributors.append(project_contributor.contributors_user_id)
-        if self.request.user in project_contributors and issue in project_issues:
+        if is_project_member(self.request, project_id) and \
+                Issues.objects.filter(id=issue_id, issue_project_id=project_id).exists():
+            queryset = self.queryset.filter(comments_issue_id=issue_id)
             if comment_id:
                 queryset = queryset.filter(id=comment_id)
             return queryset
@@ -237,14 +563,9 @@ class IssueCommentsViewer(MultipleSerializerMixin, ModelViewSet):
 
     def perform_create(self, serializer):
         project_id = self.kwargs.get("project_pk")
-        project = Projects.objects.get(id=project_id)
-        project_contributors = []
-        project_contributors_req = Contributors.objects.filter(contributors_project_id=project)
-        for project_contributor in project_contributors_req:
-            project_contributors.append(project_contributor.contributors_user_id)
         issue_id = self.kwargs.get('issues_pk')
-        issue = Issues.objects.get(id=issue_id)
-        if self.request.user in project_contributors:
+        if is_project_member(self.request, project_id):
+            issue = get_object_or_404(Issues, id=issue_id, issue_project_id=project_id)
             try:
                 serializer.save(comments_issue_id=issue, comments_author_user_id=self.request.user)
             except:
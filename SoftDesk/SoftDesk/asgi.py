@@ -2,6 +2,7 @@
 ASGI config for SoftDesk project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The read routes are served by the async views (see SoftDesk/asgi_urls.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -12,5 +13,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "SoftDesk.settings")
+os.environ.setdefault("SOFTDESK_ROOT_URLCONF", "SoftDesk.asgi_urls")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# imported once the settings and the applications are ready
+from API.middleware import DisconnectWatcher  # noqa: E402
+
+application = DisconnectWatcher(django_application)
@@ -0,0 +1,24 @@
+"""
+URL configuration of the ASGI application.
+
+The GET requests of the projects, issues and comments routes and the signups are served by the async
+views of API.async_views, everything else by the routes of SoftDesk.urls. The Server-Sent Events stream
+of a project, /api/projects/{id}/events/, only exists here, and its export is streamed from an async iterator.
+"""
+from django.urls import path
+
+from API import async_views
+from SoftDesk.urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/signup/', async_views.signup),
+    path('api/projects/', async_views.projects_list_view),
+    path('api/projects/<int:pk>/', async_views.projects_detail_view),
+    path('api/projects/<int:pk>/events/', async_views.project_events),
+    path('api/projects/<int:pk>/export/', async_views.project_export_view),
+    path('api/projects/<int:project_pk>/issues/', async_views.issues_list_view),
+    path('api/projects/<int:project_pk>/issues/<int:pk>/', async_views.issues_detail_view),
+    path('api/projects/<int:project_pk>/issues/<int:issues_pk>/comments/', async_views.comments_list_view),
+    path('api/projects/<int:project_pk>/issues/<int:issues_pk>/comments/<int:pk>/',
+         async_views.comments_detail_view),
+] + sync_urlpatterns
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/4.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -39,11 +40,13 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     "API",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "API.middleware.RequestTimingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -52,7 +55,8 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
-ROOT_URLCONF = "SoftDesk.urls"
+# SoftDesk/asgi.py switches to SoftDesk.asgi_urls, which serves the read routes with async views
+ROOT_URLCONF = os.environ.get("SOFTDESK_ROOT_URLCONF", "SoftDesk.urls")
 
 TEMPLATES = [
     {
@@ -83,6 +87,47 @@ DATABASES = {
     }
 }
 
+# Production profile of the SQLite database, used with SOFTDESK_DATABASE_PROFILE=production (see API.sqlite) :
+# WAL journal (the readers don't wait for the writer), synchronous=NORMAL (no fsync by commit, durable at the
+# checkpoints, safe with WAL), 5 s busy timeout, 256 MB memory map and 64 MB page cache by connection, the
+# connections are kept CONN_MAX_AGE seconds. The transactions start with BEGIN IMMEDIATE, the writers of a
+# process wait for each other on a lock, a BEGIN refused is tried again begin_retries times.
+SQLITE_PRODUCTION_DATABASE = {
+    "ENGINE": "API.sqlite",
+    "CONN_MAX_AGE": 600,
+    "CONN_HEALTH_CHECKS": True,
+    "OPTIONS": {
+        "timeout": 5,
+        "write_lock_timeout": 5,
+        "begin_retries": 3,
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 268435456,
+            "cache_size": -65536,
+        },
+    },
+}
+if os.environ.get("SOFTDESK_DATABASE_PROFILE") == "production":
+    DATABASES["default"].update(SQLITE_PRODUCTION_DATABASE)
+
+
+# Password hashing
+# Cost of the password hashes, lowered for the development and test environments with
+# SOFTDESK_PASSWORD_ITERATIONS, and size of the pool of threads hashing them (see API.hashing)
+API_PASSWORD_HASHING = {
+    'ITERATIONS': int(os.environ.get('SOFTDESK_PASSWORD_ITERATIONS', 600000)),
+    'WORKERS': int(os.environ.get('SOFTDESK_PASSWORD_WORKERS', 4)),
+}
+
+PASSWORD_HASHERS = [
+    'API.hashing.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -128,8 +173,86 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = 'API.Users'
 
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',),
+    'DEFAULT_AUTHENTICATION_CLASSES': ('API.authentication.CachedJWTAuthentication',),
     'DATETIME_FORMAT': '%d/%m/%Y %H:%M:%S',
+    'DEFAULT_PAGINATION_CLASS': 'API.pagination.IdCursorPagination',
+    'PAGE_SIZE': 50,
+}
+
+# Cache of the project / issue / comment read responses, invalidated on writes.
+# Use 'API.cache.RedisCacheBackend' with OPTIONS {'url': ...} (or {'client_class': ...} for a Redis
+# compatible client, 'API.cache.LocalRedisClient' in one process) to share it between workers.
+API_RESPONSE_CACHE = {
+    'ENABLED': True,
+    'BACKEND': 'API.cache.LRUCacheBackend',
+    'OPTIONS': {'max_entries': 1024},
+}
+
+# Maximum number of issues accepted by one request on the bulk issues route
+API_BULK_MAX_ITEMS = 500
+
+# Number of rows fetched at a time by the project export stream
+API_EXPORT_CHUNK_SIZE = 2000
+
+# Add Server-Timing headers and a log line (logger API.timing) with the SQL, serializer and total time
+# of each request
+API_REQUEST_TIMING = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'API.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Full-text index of the issues and comments used by /api/search/, None disables the search
+API_SEARCH_BACKEND = 'API.search.SQLiteFTSBackend'
+
+# Serialize the projects, issues and comments lists from values() rows (API.fast_serializers) instead of
+# the model serializers, same JSON
+API_FAST_LIST_SERIALIZATION = False
+
+# Users resolved from the access tokens, kept in memory by API.authentication.CachedJWTAuthentication
+API_USER_CACHE = {
+    'MAX_ENTRIES': 4096,
+    'TIMEOUT': 60,
+}
+
+# Number of most recent comments embedded in the issue detail, the others are read from the comments route
+API_EMBEDDED_COMMENTS = 20
+
+# Upper bound accepted for the ?page_size= parameter of the paginated lists
+API_MAX_PAGE_SIZE = 200
+
+# Delta sync of /api/projects/{id}/changes/ (API.changes) : the rows written up to OVERLAP seconds before the
+# cursor are sent again, for the writes committed after a sync which started later. The tombstones of the
+# deletions are kept TOMBSTONE_RETENTION days (purge_deletions command), an older cursor is answered with a 410
+API_CHANGES = {
+    'OVERLAP': 5,
+    'TOMBSTONE_RETENTION': 30,
+}
+
+# Server-Sent Events of /api/projects/{id}/events/ on the ASGI application (API.events). A stream keeps at most
+# QUEUE_SIZE events not sent yet, beyond it gets a resync event and is closed. It sends a comment line every
+# KEEPALIVE seconds without event and ends after MAX_AGE seconds, the client reconnects.
+# FANOUT {'url': 'redis://...'} (or {'client_class': ...} for a Redis compatible client) publishes the events
+# through Redis, to the streams of every worker.
+API_EVENTS = {
+    'ENABLED': True,
+    'QUEUE_SIZE': 100,
+    'KEEPALIVE': 15,
+    'MAX_AGE': 300,
+    'FANOUT': None,
 }
 
 SIMPLE_JWT = {
@@ -137,4 +260,16 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(minutes=60),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_OBTAIN_SERIALIZER': 'API.tokens.FrontedTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'API.tokens.FrontedTokenRefreshSerializer',
+}
+
+# Blacklist of the rotated refresh tokens : Bloom filter sized for CAPACITY JTIs in front of the
+# token_blacklist tables, synced with the other processes every SYNC_INTERVAL seconds, expired tokens
+# purged every PURGE_INTERVAL seconds
+API_TOKEN_BLACKLIST = {
+    'CAPACITY': 100000,
+    'ERROR_RATE': 0.001,
+    'SYNC_INTERVAL': 30,
+    'PURGE_INTERVAL': 3600,
 }
@@ -19,7 +19,8 @@ from django.urls import path, include
 from rest_framework_nested import routers
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
-from API.views import SignupView, ProjectsViewset, ProjectContributorsViewset, ProjectIssuesViewer, IssueCommentsViewer
+from API.views import SignupView, ProjectsViewset, ProjectContributorsViewset, ProjectIssuesViewer, IssueCommentsViewer, \
+    SearchView
 
 """ add a router to manage URL """
 router = routers.SimpleRouter()
@@ -57,6 +58,7 @@ urlpatterns = [
     path('api/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/login/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/signup/', SignupView.as_view(), name='signup'),
+    path('api/search/', SearchView.as_view(), name='search'),
     path('api/', include(router.urls)),
     path('api/', include(projects_router.urls)),
     path('api/', include(issues_router.urls)),